@@ -1,13 +1,22 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Security
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Security, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Annotated
 import logging
+import hmac
 import json
+import orjson
+import msgspec
 from datetime import datetime, timedelta
 import os
+import re
+import time
+import queue
+import threading
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 import uvicorn
 
@@ -15,7 +24,7 @@ from config import config
 from google_drive_client import GoogleDriveClient
 from document_processor import DocumentProcessor
 from knowledge_base import KnowledgeBase
-from qa_system import QASystem
+from qa_system import QASystem, iso_now
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -57,22 +66,159 @@ class StatsResponse(BaseModel):
     system_info: Dict[str, Any]
     uptime: str
 
+# msgspec structs used to decode request bodies on the hot path; the Pydantic
+# request models above only describe the bodies in the OpenAPI schema
+class QuestionPayload(msgspec.Struct):
+    question: Annotated[str, msgspec.Meta(min_length=1, max_length=1000)]
+    max_context_items: Annotated[int, msgspec.Meta(ge=1, le=20)] = 5
+    include_sources: bool = True
+
+class DocumentSyncPayload(msgspec.Struct):
+    force_refresh: bool = False
+    folder_ids: Optional[List[str]] = None
+
+question_decoder = msgspec.json.Decoder(QuestionPayload)
+document_sync_decoder = msgspec.json.Decoder(DocumentSyncPayload)
+
+def _request_body_schema(model) -> Dict[str, Any]:
+    """OpenAPI requestBody entry for an endpoint that decodes its own body"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}}
+        }
+    }
+
+# msgspec error messages: "<message> - at `$.field[0]`" and "Object missing required field `field`"
+MSGSPEC_PATH_PATTERN = re.compile(r"^(?P<msg>.*) - at `\$(?P<path>.*)`$")
+MSGSPEC_PATH_PART_PATTERN = re.compile(r"\.([^.\[]+)|\[(\d+)\]")
+MSGSPEC_MISSING_PATTERN = re.compile(r"^Object missing required field `(?P<field>.+)`$")
+
+def _validation_detail(error: Exception) -> List[Dict[str, Any]]:
+    """Map a msgspec error to FastAPI's 422 detail shape: a list of {type, loc, msg}"""
+    # ValidationError subclasses DecodeError, so anything else is malformed JSON
+    if not isinstance(error, msgspec.ValidationError):
+        return [{"type": "json_invalid", "loc": ["body"], "msg": str(error)}]
+    
+    message = str(error)
+    loc: List[Any] = ["body"]
+    match = MSGSPEC_PATH_PATTERN.match(message)
+    if match:
+        message = match.group("msg")
+        for key, index in MSGSPEC_PATH_PART_PATTERN.findall(match.group("path")):
+            loc.append(key if key else int(index))
+    
+    missing = MSGSPEC_MISSING_PATTERN.match(message)
+    if missing:
+        return [{"type": "missing", "loc": loc + [missing.group("field")], "msg": "Field required"}]
+    return [{"type": "value_error", "loc": loc, "msg": message}]
+
+async def decode_body(request: Request, decoder: msgspec.json.Decoder):
+    """Decode and validate a JSON request body with msgspec, reporting errors like FastAPI does"""
+    try:
+        return decoder.decode(await request.body())
+    except (msgspec.ValidationError, msgspec.DecodeError) as e:
+        raise HTTPException(status_code=422, detail=_validation_detail(e))
+
+def _orjson_default(obj: Any) -> Any:
+    """Serialize response models built with model_construct (no validation)"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError
+
+class FastORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also handles naive datetimes, numpy values and models"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+class EmbeddingBatcher:
+    """Coalesce concurrent query embeddings into one embeddings API request"""
+    
+    def __init__(self, embed_batch, window: float = 0.002, max_batch: int = 64):
+        self.embed_batch = embed_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        # The event loop only holds weak references to tasks, so in-flight batches are kept here
+        self._tasks = set()
+    
+    async def embed(self, text: str):
+        """Embed a single text, sharing the request with other in-flight callers"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch):
+        try:
+            vectors = await asyncio.to_thread(self.embed_batch, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
 # Global variables
 knowledge_base = None
 qa_system = None
 google_drive_client = None
 app_start_time = datetime.now()
 
+# Number of chunks embedded and written to the vector store at a time
+INGEST_BATCH_SIZE = 64
+
+# How long the Drive producer waits on a full queue before checking whether the consumer stopped
+INGEST_PUT_TIMEOUT = 0.5
+
+# Ingests clear and rebuild the shared collection and share the Drive client,
+# so the startup load and /sync requests run one at a time
+INGEST_LOCK = threading.Lock()
+
+# Serialized /health body, reused for HEALTH_CACHE_SECONDS
+HEALTH_CACHE_SECONDS = 1.0
+_health_checked_at = 0.0
+_health_body = b""
+
+# Query embeddings for concurrent /ask requests are sent as one batch
+embedding_batcher = EmbeddingBatcher(lambda texts: knowledge_base.embed_queries(texts))
+
 # Security
 security = HTTPBearer()
+API_TOKEN_BYTES = config.api_token.encode('utf-8') if config.api_token else None
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     """Verify API token"""
-    expected_token = os.getenv("API_TOKEN")
-    if not expected_token:
+    if not API_TOKEN_BYTES:
         raise HTTPException(status_code=500, detail="API token not configured")
     
-    if credentials.credentials != expected_token:
+    if not hmac.compare_digest(credentials.credentials.encode('utf-8'), API_TOKEN_BYTES):
         raise HTTPException(status_code=401, detail="Invalid authentication token")
     
     return credentials
@@ -82,6 +228,14 @@ async def lifespan(app: FastAPI):
     """Application lifespan management"""
     # Startup
     logger.info("Starting Leadership Knowledge Base API...")
+    
+    if not config.api_token:
+        logger.error("API_TOKEN is not configured; authenticated endpoints will return 500")
+    
+    # Bounded pool for blocking Drive, processing and vector store calls
+    executor = ThreadPoolExecutor(max_workers=config.max_concurrent_requests)
+    asyncio.get_running_loop().set_default_executor(executor)
+    
     await initialize_system()
     
     # Optionally load documents on startup
@@ -94,13 +248,17 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down API...")
+    if google_drive_client:
+        google_drive_client.close()
+    executor.shutdown(wait=False)
 
 # Create FastAPI app
 app = FastAPI(
     title="Leadership Knowledge Base API",
     description="AI-powered knowledge base agent for accessing Google Drive documents",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastORJSONResponse
 )
 
 # CORS middleware
@@ -134,43 +292,141 @@ async def initialize_system():
         logger.error(f"Failed to initialize system: {e}")
         raise
 
+def ingest_documents(folder_ids: Optional[List[str]] = None, force_refresh: bool = False) -> Tuple[int, int]:
+    """Rebuild the knowledge base from Google Drive, waiting for any ingest already running"""
+    with INGEST_LOCK:
+        return _ingest_documents(folder_ids=folder_ids, force_refresh=force_refresh)
+
+def _ingest_documents(folder_ids: Optional[List[str]] = None, force_refresh: bool = False) -> Tuple[int, int]:
+    """Stream documents from Google Drive through the processor into the knowledge base
+    
+    Drive downloads run in a producer thread while this thread chunks each
+    document and writes chunks in batches, so neither the fetched documents
+    nor the full chunk list are held in memory at once. The knowledge base
+    is only cleared once the first document has arrived, so a failure after
+    that point leaves it holding only the chunks written so far until the
+    next successful sync rebuilds it.
+    """
+    # Built before the producer starts, so a failure here cannot strand it
+    processor = DocumentProcessor()
+    
+    documents = queue.Queue(maxsize=8)
+    done = object()
+    stop = threading.Event()
+    errors = []
+    
+    def put(item) -> bool:
+        """Queue an item for the consumer; False once the consumer has stopped"""
+        while not stop.is_set():
+            try:
+                documents.put(item, timeout=INGEST_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        source = google_drive_client.iter_documents(folder_ids=folder_ids, force_refresh=force_refresh)
+        try:
+            for document in source:
+                if not put(document):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # Closing the generator also stops the Drive listing and download workers
+            source.close()
+            put(done)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    
+    document_count = 0
+    chunk_count = 0
+    batch = []
+    
+    def queued_documents():
+        nonlocal document_count
+        while True:
+            document = documents.get()
+            if document is done:
+                return
+            
+            if document_count == 0:
+                knowledge_base.clear_knowledge_base()
+            document_count += 1
+            yield document
+    
+    try:
+        for chunk in processor.iter_chunks(queued_documents()):
+            batch.append(chunk)
+            if len(batch) >= INGEST_BATCH_SIZE:
+                knowledge_base.add_documents(batch)
+                chunk_count += len(batch)
+                batch = []
+        
+        if batch:
+            knowledge_base.add_documents(batch)
+            chunk_count += len(batch)
+        
+        if chunk_count:
+            knowledge_base.persist()
+    finally:
+        # If processing or indexing failed, release a producer blocked on the full queue
+        stop.set()
+        while True:
+            try:
+                documents.get_nowait()
+            except queue.Empty:
+                break
+        producer.join()
+    
+    if errors:
+        raise errors[0]
+    
+    return document_count, chunk_count
+
 async def load_documents_background():
     """Load documents in the background"""
     try:
         logger.info("Starting background document loading...")
         
-        # Fetch documents from Google Drive
-        documents = google_drive_client.fetch_all_documents()
+        # Fetch, process and index documents as a single streaming pipeline
+        document_count, chunk_count = await asyncio.to_thread(ingest_documents)
         
-        if not documents:
+        if not document_count:
             logger.warning("No documents found in Google Drive")
             return
         
-        # Process documents
-        processor = DocumentProcessor()
-        processed_chunks = processor.process_all_documents(documents)
-        
-        # Update knowledge base
-        knowledge_base.update_documents(processed_chunks)
+        qa_system.clear_caches()
         
-        logger.info(f"Successfully loaded {len(documents)} documents ({len(processed_chunks)} chunks)")
+        logger.info(f"Successfully loaded {document_count} documents ({chunk_count} chunks)")
         
     except Exception as e:
         logger.error(f"Background document loading failed: {e}")
 
-@app.get("/", response_model=Dict[str, str])
+# The root payload never changes, so serialize it once
+ROOT_RESPONSE = FastORJSONResponse({
+    "message": "Leadership Knowledge Base API",
+    "version": "1.0.0",
+    "status": "operational",
+    "docs": "/docs"
+})
+
+@app.get("/", responses={200: {"model": Dict[str, str]}})
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Leadership Knowledge Base API",
-        "version": "1.0.0",
-        "status": "operational",
-        "docs": "/docs"
-    }
+    return ROOT_RESPONSE
 
-@app.get("/health", response_model=HealthResponse)
+@app.get("/health", responses={200: {"model": HealthResponse}})
 async def health_check():
     """Health check endpoint"""
+    global _health_checked_at, _health_body
+    
+    now = time.monotonic()
+    if now - _health_checked_at < HEALTH_CACHE_SECONDS:
+        return Response(content=_health_body, media_type="application/json")
+    
     try:
         # Check system components
         components = {
@@ -182,7 +438,7 @@ async def health_check():
         # Test knowledge base connection
         if knowledge_base:
             try:
-                stats = knowledge_base.get_collection_stats()
+                stats = await asyncio.to_thread(knowledge_base.get_collection_stats)
                 if stats.get('total_documents', 0) > 0:
                     components["knowledge_base"] = "healthy"
                 else:
@@ -192,108 +448,122 @@ async def health_check():
         
         overall_status = "healthy" if all(status == "healthy" for status in components.values()) else "degraded"
         
-        return HealthResponse(
+        response = FastORJSONResponse(HealthResponse.model_construct(
             status=overall_status,
-            timestamp=datetime.now().isoformat(),
+            timestamp=iso_now(),
             version="1.0.0",
             components=components
-        )
+        ))
+        
+        _health_body = response.body
+        _health_checked_at = now
+        return response
         
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=500, detail="Health check failed")
 
-@app.post("/ask", response_model=QuestionResponse)
+@app.post(
+    "/ask",
+    responses={200: {"model": QuestionResponse}},
+    openapi_extra=_request_body_schema(QuestionRequest)
+)
 async def ask_question(
-    request: QuestionRequest,
+    http_request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(verify_token)
 ):
     """Ask a question to the knowledge base"""
-    start_time = datetime.now()
+    start_perf = time.perf_counter()
+    request = await decode_body(http_request, question_decoder)
     
     try:
         if not qa_system:
             raise HTTPException(status_code=503, detail="QA system not initialized")
         
-        # Process the question
-        answer_result = qa_system.answer_question(
+        # The question embedding is batched with concurrent requests and keys the QA answer cache
+        question_embedding = await embedding_batcher.embed(request.question)
+        
+        # Process the question on the default executor so the blocking LLM call
+        # does not serialize concurrent requests on the event loop
+        answer_result = await asyncio.to_thread(
+            qa_system.answer_question,
             request.question,
-            max_context_items=request.max_context_items
+            max_context_items=request.max_context_items,
+            query_embedding=question_embedding
         )
         
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = time.perf_counter() - start_perf
         
         # Format response
-        response = QuestionResponse(
+        return FastORJSONResponse(QuestionResponse.model_construct(
             answer=answer_result['answer'],
             confidence=answer_result['confidence'],
             sources=answer_result['sources'] if request.include_sources else [],
             question=request.question,
             timestamp=answer_result['timestamp'],
             processing_time=processing_time
-        )
-        
-        return response
+        ))
         
     except Exception as e:
         logger.error(f"Question processing failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process question: {str(e)}")
 
-@app.post("/sync", response_model=DocumentSyncResponse)
+@app.post(
+    "/sync",
+    responses={200: {"model": DocumentSyncResponse}},
+    openapi_extra=_request_body_schema(DocumentSyncRequest)
+)
 async def sync_documents(
-    request: DocumentSyncRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks,
     credentials: HTTPAuthorizationCredentials = Depends(verify_token)
 ):
     """Sync documents from Google Drive"""
-    start_time = datetime.now()
+    start_perf = time.perf_counter()
+    request = await decode_body(http_request, document_sync_decoder)
     
     try:
         if not google_drive_client:
             raise HTTPException(status_code=503, detail="Google Drive client not initialized")
         
-        # Fetch documents
-        documents = google_drive_client.fetch_all_documents(
+        # Fetch, process and index documents as a single streaming pipeline
+        document_count, chunk_count = await asyncio.to_thread(
+            ingest_documents,
             folder_ids=request.folder_ids,
             force_refresh=request.force_refresh
         )
         
-        if not documents:
-            return DocumentSyncResponse(
+        if not document_count:
+            return FastORJSONResponse(DocumentSyncResponse.model_construct(
                 success=True,
                 documents_processed=0,
                 chunks_created=0,
-                processing_time=(datetime.now() - start_time).total_seconds(),
+                processing_time=time.perf_counter() - start_perf,
                 message="No documents found to sync"
-            )
+            ))
         
-        # Process documents
-        processor = DocumentProcessor()
-        processed_chunks = processor.process_all_documents(documents)
+        qa_system.clear_caches()
         
-        # Update knowledge base
-        knowledge_base.update_documents(processed_chunks)
+        processing_time = time.perf_counter() - start_perf
         
-        processing_time = (datetime.now() - start_time).total_seconds()
-        
-        return DocumentSyncResponse(
+        return FastORJSONResponse(DocumentSyncResponse.model_construct(
             success=True,
-            documents_processed=len(documents),
-            chunks_created=len(processed_chunks),
+            documents_processed=document_count,
+            chunks_created=chunk_count,
             processing_time=processing_time,
-            message=f"Successfully synced {len(documents)} documents"
-        )
+            message=f"Successfully synced {document_count} documents"
+        ))
         
     except Exception as e:
         logger.error(f"Document sync failed: {e}")
         raise HTTPException(status_code=500, detail=f"Document sync failed: {str(e)}")
 
-@app.get("/stats", response_model=StatsResponse)
+@app.get("/stats", responses={200: {"model": StatsResponse}})
 async def get_stats(credentials: HTTPAuthorizationCredentials = Depends(verify_token)):
     """Get system statistics"""
     try:
         # Knowledge base stats
-        kb_stats = knowledge_base.get_collection_stats() if knowledge_base else {}
+        kb_stats = await asyncio.to_thread(knowledge_base.get_collection_stats) if knowledge_base else {}
         
         # System info
         system_info = {
@@ -308,11 +578,11 @@ async def get_stats(credentials: HTTPAuthorizationCredentials = Depends(verify_t
         uptime = datetime.now() - app_start_time
         uptime_str = str(uptime).split('.')[0]  # Remove microseconds
         
-        return StatsResponse(
+        return FastORJSONResponse(StatsResponse.model_construct(
             knowledge_base_stats=kb_stats,
             system_info=system_info,
             uptime=uptime_str
-        )
+        ))
         
     except Exception as e:
         logger.error(f"Stats retrieval failed: {e}")
@@ -331,11 +601,11 @@ async def search_faq(
         
         suggestions = qa_system.get_faq_suggestions(query, limit)
         
-        return {
+        return FastORJSONResponse({
             "query": query,
             "suggestions": suggestions,
             "count": len(suggestions)
-        }
+        })
         
     except Exception as e:
         logger.error(f"FAQ search failed: {e}")
@@ -345,6 +615,7 @@ async def search_faq(
 async def search_meetings(
     topic: str,
     limit: int = 5,
+    offset: int = 0,
     credentials: HTTPAuthorizationCredentials = Depends(verify_token)
 ):
     """Search meeting notes"""
@@ -352,13 +623,13 @@ async def search_meetings(
         if not qa_system:
             raise HTTPException(status_code=503, detail="QA system not initialized")
         
-        topics = qa_system.search_meeting_topics(topic, limit)
+        topics = qa_system.search_meeting_topics(topic, limit, offset=offset)
         
-        return {
+        return FastORJSONResponse({
             "topic": topic,
             "results": topics,
             "count": len(topics)
-        }
+        })
         
     except Exception as e:
         logger.error(f"Meeting search failed: {e}")
@@ -376,7 +647,7 @@ async def refresh_documents(
         
         return {
             "message": "Document refresh started in background",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": iso_now()
         }
         
     except Exception as e:
@@ -390,38 +661,50 @@ async def list_documents(credentials: HTTPAuthorizationCredentials = Depends(ver
         if not knowledge_base:
             raise HTTPException(status_code=503, detail="Knowledge base not initialized")
         
-        # Get document metadata
-        all_docs = knowledge_base.vector_store.get()
-        
-        # Extract unique documents
-        documents = {}
-        if all_docs and 'metadatas' in all_docs:
-            for metadata in all_docs['metadatas']:
-                if metadata:
-                    doc_id = metadata.get('document_id')
-                    if doc_id and doc_id not in documents:
-                        documents[doc_id] = {
-                            'id': doc_id,
-                            'title': metadata.get('document_title', 'Untitled'),
-                            'type': metadata.get('document_type', 'unknown'),
-                            'added_at': metadata.get('added_at')
-                        }
-        
-        return {
-            "documents": list(documents.values()),
+        # Get document metadata (skip chunk text and embeddings)
+        all_docs = knowledge_base.collection.get(include=['metadatas'])
+        
+        # Extract unique documents in a single pass
+        seen = set()
+        documents = []
+        for metadata in (all_docs or {}).get('metadatas') or ():
+            if not metadata:
+                continue
+            doc_id = metadata.get('document_id')
+            if not doc_id or doc_id in seen:
+                continue
+            seen.add(doc_id)
+            documents.append({
+                'id': doc_id,
+                'title': metadata.get('document_title', 'Untitled'),
+                'type': metadata.get('document_type', 'unknown'),
+                'added_at': metadata.get('added_at')
+            })
+        
+        return FastORJSONResponse({
+            "documents": documents,
             "count": len(documents)
-        }
+        })
         
     except Exception as e:
         logger.error(f"Document listing failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to list documents")
 
 if __name__ == "__main__":
-    # Run the server
+    reload = os.getenv("ENVIRONMENT", "production") == "development"
+    
+    # Run the server; uvloop/httptools are picked up automatically when installed.
+    # Defaults to a single worker: every worker runs its own lifespan, so with
+    # LOAD_DOCS_ON_STARTUP each one would clear and re-ingest the same
+    # VECTOR_STORE_PATH concurrently, and they would also share the embedding
+    # and answer cache files. Only raise WORKERS with startup ingest disabled.
     uvicorn.run(
         "api_service:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
         log_level="info",
-        reload=os.getenv("ENVIRONMENT", "production") == "development"
+        reload=reload,
+        workers=1 if reload else int(os.getenv("WORKERS", "1")),
+        loop="auto",
+        http="auto"
     ) 
\ No newline at end of file
@@ -1,37 +1,169 @@
 import os
 from pathlib import Path
+from dataclasses import dataclass, field
 from typing import List, Optional
 from dotenv import load_dotenv
 import json
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration management for the Leadership Knowledge Base Agent"""
+    """Configuration management for the Leadership Knowledge Base Agent
+    
+    Values are resolved from the environment once by ``Config.from_env()``;
+    the instance is immutable afterwards.
+    """
+    
+    # Environment
+    environment: str
+    is_production: bool
+    
+    # OpenAI Configuration
+    openai_api_key: Optional[str]
+    embedding_model: str
+    qa_model: str
+    max_tokens: int
+    temperature: float
+    
+    # Google Configuration
+    google_credentials_path: str
+    google_token_path: str
+    
+    # Document Configuration (legacy support)
+    faq_document_ids: List[str]
+    meeting_notes_document_ids: List[str]
+    
+    # Vector Store Configuration
+    vector_store_path: str
+    collection_name: str
+    document_cache_path: str
+    embedding_cache_path: str
+    llm_cache_path: str
+    answer_cache_path: str
+    
+    # Text Processing Configuration
+    chunk_size: int
+    chunk_overlap: int
+    
+    # API Configuration
+    api_host: str
+    api_port: int
+    api_token: Optional[str]
+    
+    # Database Configuration (for cloud deployment)
+    database_url: Optional[str]
+    redis_url: Optional[str]
     
-    def __init__(self):
-        # Environment
-        self.environment = os.getenv('ENVIRONMENT', 'development')
-        self.is_production = self.environment == 'production'
+    # Slack Configuration
+    slack_bot_token: Optional[str]
+    slack_signing_secret: Optional[str]
+    slack_app_token: Optional[str]
+    
+    # Cloud Configuration
+    aws_region: str
+    ecr_repository: Optional[str]
+    
+    # Logging Configuration
+    log_level: str
+    log_format: str
+    
+    # Performance Configuration
+    max_concurrent_requests: int
+    request_timeout: int
+    cache_ttl: int
+    semantic_cache_ttl: int
+    semantic_cache_threshold: float
+    max_cache_entries: int
+    
+    # Feature Flags
+    load_docs_on_startup: bool
+    enable_metrics: bool
+    enable_tracing: bool
+    
+    # Security Configuration
+    cors_origins: List[str]
+    rate_limit_per_minute: int
+    
+    # Cached validation results (see validate_config)
+    _validation: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """Resolve configuration from environment variables"""
+        environment = os.getenv('ENVIRONMENT', 'development')
+        google_credentials_path = os.getenv('GOOGLE_CREDENTIALS_PATH', 'credentials.json')
         
-        # OpenAI Configuration
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.embedding_model = os.getenv('EMBEDDING_MODEL', 'text-embedding-ada-002')
-        self.qa_model = os.getenv('QA_MODEL', 'gpt-3.5-turbo')
-        self.max_tokens = int(os.getenv('MAX_TOKENS', '1000'))
-        self.temperature = float(os.getenv('TEMPERATURE', '0.7'))
+        # Handle Google credentials from environment (for cloud deployment)
+        cls._write_google_credentials(google_credentials_path)
         
-        # Google Configuration
-        self.google_credentials_path = os.getenv('GOOGLE_CREDENTIALS_PATH', 'credentials.json')
-        self.google_token_path = os.getenv('GOOGLE_TOKEN_PATH', 'token.json')
+        instance = cls(
+            environment=environment,
+            is_production=environment == 'production',
+            openai_api_key=os.getenv('OPENAI_API_KEY'),
+            embedding_model=os.getenv('EMBEDDING_MODEL', 'text-embedding-ada-002'),
+            qa_model=os.getenv('QA_MODEL', 'gpt-3.5-turbo'),
+            max_tokens=int(os.getenv('MAX_TOKENS', '1000')),
+            temperature=float(os.getenv('TEMPERATURE', '0.7')),
+            google_credentials_path=google_credentials_path,
+            google_token_path=os.getenv('GOOGLE_TOKEN_PATH', 'token.json'),
+            faq_document_ids=cls._parse_document_ids(os.getenv('FAQ_DOCUMENT_IDS', '')),
+            meeting_notes_document_ids=cls._parse_document_ids(os.getenv('MEETING_NOTES_DOCUMENT_IDS', '')),
+            vector_store_path=os.getenv('VECTOR_STORE_PATH', './vector_store'),
+            collection_name=os.getenv('COLLECTION_NAME', 'leadership_knowledge_base'),
+            document_cache_path=os.getenv('DOCUMENT_CACHE_PATH', './document_cache'),
+            embedding_cache_path=os.getenv('EMBEDDING_CACHE_PATH', './embedding_cache.sqlite3'),
+            llm_cache_path=os.getenv('LLM_CACHE_PATH', './llm_cache.sqlite3'),
+            answer_cache_path=os.getenv('ANSWER_CACHE_PATH', './answer_cache.npz'),
+            chunk_size=int(os.getenv('CHUNK_SIZE', '1000')),
+            chunk_overlap=int(os.getenv('CHUNK_OVERLAP', '200')),
+            api_host=os.getenv('API_HOST', '0.0.0.0'),
+            api_port=int(os.getenv('PORT', '8000')),
+            api_token=os.getenv('API_TOKEN'),
+            database_url=os.getenv('DATABASE_URL'),
+            redis_url=os.getenv('REDIS_URL'),
+            slack_bot_token=os.getenv('SLACK_BOT_TOKEN'),
+            slack_signing_secret=os.getenv('SLACK_SIGNING_SECRET'),
+            slack_app_token=os.getenv('SLACK_APP_TOKEN'),
+            aws_region=os.getenv('AWS_REGION', 'us-east-1'),
+            ecr_repository=os.getenv('ECR_REPOSITORY'),
+            log_level=os.getenv('LOG_LEVEL', 'INFO'),
+            log_format=os.getenv('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s'),
+            max_concurrent_requests=int(os.getenv('MAX_CONCURRENT_REQUESTS', '10')),
+            request_timeout=int(os.getenv('REQUEST_TIMEOUT', '30')),
+            cache_ttl=int(os.getenv('CACHE_TTL', '3600')),  # 1 hour
+            semantic_cache_ttl=int(os.getenv('SEMANTIC_CACHE_TTL', '300')),
+            semantic_cache_threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95')),
+            max_cache_entries=int(os.getenv('MAX_CACHE_ENTRIES', '1000')),
+            load_docs_on_startup=os.getenv('LOAD_DOCS_ON_STARTUP', 'false').lower() == 'true',
+            enable_metrics=os.getenv('ENABLE_METRICS', 'false').lower() == 'true',
+            enable_tracing=os.getenv('ENABLE_TRACING', 'false').lower() == 'true',
+            cors_origins=cls._parse_cors_origins(os.getenv('CORS_ORIGINS', '*')),
+            rate_limit_per_minute=int(os.getenv('RATE_LIMIT_PER_MINUTE', '60'))
+        )
         
-        # Handle Google credentials from environment (for cloud deployment)
+        # Ensure required directories exist
+        instance._ensure_directories()
+        
+        # Validation only depends on startup state, so compute it once
+        object.__setattr__(instance, '_validation', instance._compute_validation())
+        
+        return instance
+    
+    @staticmethod
+    def _write_google_credentials(credentials_path: str):
+        """Write GOOGLE_CREDENTIALS_JSON to the credentials file if it does not exist yet"""
         google_creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
-        if google_creds_json and not os.path.exists(self.google_credentials_path):
+        if google_creds_json and not os.path.exists(credentials_path):
             try:
                 # Decode if base64 encoded
                 import base64
@@ -42,74 +174,27 @@ class Config:
                     pass
                 
                 # Write credentials to file
-                with open(self.google_credentials_path, 'w') as f:
+                with open(credentials_path, 'w') as f:
                     if google_creds_json.startswith('{'):
                         f.write(google_creds_json)
+                    elif orjson:
+                        f.write(orjson.dumps(orjson.loads(google_creds_json), option=orjson.OPT_INDENT_2).decode('utf-8'))
                     else:
                         f.write(json.dumps(json.loads(google_creds_json), indent=2))
                 
                 logger.info("Google credentials written from environment variable")
             except Exception as e:
                 logger.error(f"Error writing Google credentials: {e}")
-        
-        # Document Configuration (legacy support)
-        self.faq_document_ids = self._parse_document_ids(os.getenv('FAQ_DOCUMENT_IDS', ''))
-        self.meeting_notes_document_ids = self._parse_document_ids(os.getenv('MEETING_NOTES_DOCUMENT_IDS', ''))
-        
-        # Vector Store Configuration
-        self.vector_store_path = os.getenv('VECTOR_STORE_PATH', './vector_store')
-        self.collection_name = os.getenv('COLLECTION_NAME', 'leadership_knowledge_base')
-        
-        # Text Processing Configuration
-        self.chunk_size = int(os.getenv('CHUNK_SIZE', '1000'))
-        self.chunk_overlap = int(os.getenv('CHUNK_OVERLAP', '200'))
-        
-        # API Configuration
-        self.api_host = os.getenv('API_HOST', '0.0.0.0')
-        self.api_port = int(os.getenv('PORT', '8000'))
-        self.api_token = os.getenv('API_TOKEN')
-        
-        # Database Configuration (for cloud deployment)
-        self.database_url = os.getenv('DATABASE_URL')
-        self.redis_url = os.getenv('REDIS_URL')
-        
-        # Slack Configuration
-        self.slack_bot_token = os.getenv('SLACK_BOT_TOKEN')
-        self.slack_signing_secret = os.getenv('SLACK_SIGNING_SECRET')
-        self.slack_app_token = os.getenv('SLACK_APP_TOKEN')
-        
-        # Cloud Configuration
-        self.aws_region = os.getenv('AWS_REGION', 'us-east-1')
-        self.ecr_repository = os.getenv('ECR_REPOSITORY')
-        
-        # Logging Configuration
-        self.log_level = os.getenv('LOG_LEVEL', 'INFO')
-        self.log_format = os.getenv('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        
-        # Performance Configuration
-        self.max_concurrent_requests = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
-        self.request_timeout = int(os.getenv('REQUEST_TIMEOUT', '30'))
-        self.cache_ttl = int(os.getenv('CACHE_TTL', '3600'))  # 1 hour
-        
-        # Feature Flags
-        self.load_docs_on_startup = os.getenv('LOAD_DOCS_ON_STARTUP', 'false').lower() == 'true'
-        self.enable_metrics = os.getenv('ENABLE_METRICS', 'false').lower() == 'true'
-        self.enable_tracing = os.getenv('ENABLE_TRACING', 'false').lower() == 'true'
-        
-        # Security Configuration
-        self.cors_origins = self._parse_cors_origins(os.getenv('CORS_ORIGINS', '*'))
-        self.rate_limit_per_minute = int(os.getenv('RATE_LIMIT_PER_MINUTE', '60'))
-        
-        # Ensure required directories exist
-        self._ensure_directories()
     
-    def _parse_document_ids(self, ids_string: str) -> List[str]:
+    @staticmethod
+    def _parse_document_ids(ids_string: str) -> List[str]:
         """Parse comma-separated document IDs"""
         if not ids_string:
             return []
         return [id.strip() for id in ids_string.split(',') if id.strip()]
     
-    def _parse_cors_origins(self, origins_string: str) -> List[str]:
+    @staticmethod
+    def _parse_cors_origins(origins_string: str) -> List[str]:
         """Parse CORS origins"""
         if origins_string == '*':
             return ['*']
@@ -119,14 +204,21 @@ class Config:
         """Ensure required directories exist"""
         directories = [
             self.vector_store_path,
+            self.document_cache_path,
             'logs'
         ]
         
         for directory in directories:
             Path(directory).mkdir(parents=True, exist_ok=True)
     
-    def validate_config(self) -> dict:
+    def validate_config(self, refresh: bool = False) -> dict:
         """Validate configuration and return validation results"""
+        if refresh or self._validation is None:
+            object.__setattr__(self, '_validation', self._compute_validation())
+        return self._validation
+    
+    def _compute_validation(self) -> dict:
+        """Run the configuration checks"""
         results = {
             'valid': True,
             'errors': [],
@@ -298,6 +390,10 @@ class Config:
             'chunk_overlap': self.chunk_overlap,
             'vector_store_path': self.vector_store_path,
             'collection_name': self.collection_name,
+            'document_cache_path': self.document_cache_path,
+            'embedding_cache_path': self.embedding_cache_path,
+            'llm_cache_path': self.llm_cache_path,
+            'answer_cache_path': self.answer_cache_path,
             'api_host': self.api_host,
             'api_port': self.api_port,
             'log_level': self.log_level,
@@ -308,8 +404,11 @@ class Config:
             'rate_limit_per_minute': self.rate_limit_per_minute,
             'max_concurrent_requests': self.max_concurrent_requests,
             'request_timeout': self.request_timeout,
-            'cache_ttl': self.cache_ttl
+            'cache_ttl': self.cache_ttl,
+            'semantic_cache_ttl': self.semantic_cache_ttl,
+            'semantic_cache_threshold': self.semantic_cache_threshold,
+            'max_cache_entries': self.max_cache_entries
         }
 
 # Create global config instance
-config = Config() 
\ No newline at end of file
+config = Config.from_env() 
\ No newline at end of file
@@ -1,6 +1,14 @@
+import os
 import re
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import multiprocessing
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 import tiktoken
@@ -9,10 +17,176 @@ from config import config
 
 logger = logging.getLogger(__name__)
 
+# Text cleaning: typographic punctuation is mapped to ASCII first (otherwise
+# the filter below would drop it), then a single pass collapses whitespace
+# runs (group 1) and drops runs of unsupported characters
+PUNCTUATION_TRANSLATION = str.maketrans({
+    '\u201c': '"', '\u201d': '"', '\u201e': '"',
+    '\u2018': "'", '\u2019': "'", '\u201a': "'",
+    '\u2013': '-', '\u2014': '-', '\u2212': '-',
+    '\u2026': '...'
+})
+CLEAN_RE = re.compile(r'(\s+)|[^\w\s\-.,!?():"\'/@#$%&*+=\[\]{}|\\`~<>]+')
+
+def _clean_match(match: re.Match) -> str:
+    return ' ' if match.group(1) else ''
+
+# ASCII characters CLEAN_RE would drop, as a str.translate deletion table
+ASCII_DROP_TRANSLATION = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if not c.isspace() and CLEAN_RE.fullmatch(c)
+))
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text content"""
+    if text.isascii():
+        # Fast path: no typographic punctuation to map, and whitespace
+        # collapsing plus character dropping are plain C string operations
+        return ' '.join(text.split()).translate(ASCII_DROP_TRANSLATION).strip()
+    
+    # Normalize quotes, dashes and ellipses
+    text = text.translate(PUNCTUATION_TRANSLATION)
+    
+    # Collapse whitespace and remove special characters that might interfere with processing
+    text = CLEAN_RE.sub(_clean_match, text)
+    
+    return text.strip()
+
+# FAQ patterns: lines ending with '?', then explicit Q:/A: markers
+FAQ_RE = re.compile(r'(?:^|\n)(.+\?)\s*\n(.*?)(?=\n.*\?|\n\n|\Z)', re.MULTILINE | re.DOTALL)
+QA_RE = re.compile(
+    r'(?:^|\n)(?:Q:|Question:)\s*(.+?)\n(?:A:|Answer:)\s*(.*?)(?=\n(?:Q:|Question:)|\n\n|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+
+# Common meeting section headers
+MEETING_SECTION_RES = [
+    re.compile(pattern, re.MULTILINE | re.DOTALL | re.IGNORECASE)
+    for pattern in (
+        r'(?:^|\n)((?:agenda|topics?|discussion|action items?|decisions?|notes?|summary).*?):\s*\n(.*?)(?=\n(?:agenda|topics?|discussion|action items?|decisions?|notes?|summary)|\n\n|\Z)',
+        r'(?:^|\n)(\d+\.\s*.+?)\n(.*?)(?=\n\d+\.|\n\n|\Z)',
+        r'(?:^|\n)(#{1,3}\s*.+?)\n(.*?)(?=\n#{1,3}|\n\n|\Z)'
+    )
+]
+BULLET_RE = re.compile(r'(?:^|\n)((?:[-*•]\s*.+?)(?:\n[-*•].*)*)', re.MULTILINE)
+
+# Line-start markers of MEETING_SECTION_RES (same order) followed by the
+# BULLET_RE marker. They have no lookahead or capture groups, so one scan of
+# a single alternation can report which of the full patterns could possibly
+# match; the full patterns still produce the sections.
+MEETING_HEADER_PREFILTERS = (
+    r'^(?:agenda|topics?|discussion|action items?|decisions?|notes?|summary)',
+    r'^\d+\.',
+    r'^#',
+    r'^[-*•]'
+)
+BULLET_KIND = len(MEETING_SECTION_RES)
+HEADER_PREFILTER_RE = re.compile(
+    '|'.join(f'(?P<k{i}>{pattern})' for i, pattern in enumerate(MEETING_HEADER_PREFILTERS)),
+    re.MULTILINE | re.IGNORECASE
+)
+
+def _header_kinds(text: str) -> Set[int]:
+    """Return the indices of MEETING_HEADER_PREFILTERS that occur in the text, in one scan"""
+    found = set()
+    for match in HEADER_PREFILTER_RE.finditer(text):
+        found.add(int(match.lastgroup[1:]))
+        if len(found) == len(MEETING_HEADER_PREFILTERS):
+            break
+    return found
+
+# Sentence boundaries for chunk packing: whitespace after terminal punctuation
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# tiktoken releases the GIL while encoding batches
+TOKENIZER_THREADS = max(1, (os.cpu_count() or 2) // 2)
+
+# Below this many documents a process pool costs more than it saves
+PARALLEL_MIN_DOCUMENTS = 8
+
+@lru_cache(maxsize=4)
+def get_encoder(model_name: str) -> tiktoken.Encoding:
+    """Get the tiktoken encoder for a model, building it only once per process"""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+# Chunks of recently processed documents keyed by a hash of their type and
+# content, shared by all processors in the process so re-syncs of unchanged
+# documents skip cleaning, section extraction, splitting and tokenizing
+CHUNK_CACHE_SIZE = 1024
+_chunk_cache: "OrderedDict[bytes, List[Document]]" = OrderedDict()
+_chunk_cache_lock = threading.Lock()
+
+def _get_cached_chunks(cache_key: bytes, document: Dict[str, Any]) -> Optional[List[Document]]:
+    """Copies of a document's cached chunks, labelled with its ID and title, or None on a miss"""
+    with _chunk_cache_lock:
+        cached = _chunk_cache.get(cache_key)
+        if cached is not None:
+            _chunk_cache.move_to_end(cache_key)
+    
+    if cached is None:
+        return None
+    
+    # Same content as before; only the per-document metadata may differ
+    doc_id = document.get('document_id', '')
+    title = document.get('title', 'Untitled')
+    return [
+        Document(
+            page_content=chunk.page_content,
+            metadata={**chunk.metadata, 'document_id': doc_id, 'document_title': title}
+        )
+        for chunk in cached
+    ]
+
+def _cache_chunks(cache_key: bytes, chunks: List[Document]) -> List[Document]:
+    """Store a document's chunks and return copies the caller is free to modify"""
+    with _chunk_cache_lock:
+        _chunk_cache[cache_key] = chunks
+        if len(_chunk_cache) > CHUNK_CACHE_SIZE:
+            _chunk_cache.popitem(last=False)
+    
+    return [
+        Document(page_content=chunk.page_content, metadata=dict(chunk.metadata))
+        for chunk in chunks
+    ]
+
+# Pool workers are spawned rather than forked: callers (the API, Streamlit,
+# the Slack bot) are multithreaded, and a forked child can inherit locks held
+# by other threads and deadlock. Worker functions must stay importable here.
+WORKER_CONTEXT = multiprocessing.get_context("spawn")
+
+# Each pool worker builds its own processor once instead of unpickling one per task
+_worker_processor = None
+
+def _init_worker(precise_token_count: bool = True):
+    global _worker_processor
+    _worker_processor = DocumentProcessor(precise_token_count=precise_token_count)
+
+def _process_in_worker(document: Dict[str, Any]) -> List[Document]:
+    return _worker_processor.process_document(document)
+
+@dataclass(slots=True)
+class Section:
+    """A logical section of a document; FAQ content is built from question and answer on demand"""
+    section_type: str
+    title: str
+    text: str = ''
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    
+    @property
+    def content(self) -> str:
+        if self.question is not None:
+            return f"Q: {self.question}\nA: {self.answer}"
+        return self.text
+
 class DocumentProcessor:
     """Process and chunk documents for the knowledge base"""
     
-    def __init__(self):
+    def __init__(self, precise_token_count: bool = True):
+        # When False, token counts are estimated as ~4 characters per token
+        self.precise_token_count = precise_token_count
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=config.chunk_size,
             chunk_overlap=config.chunk_overlap,
@@ -21,29 +195,13 @@ class DocumentProcessor:
         )
         
         # Initialize tokenizer for token counting
-        try:
-            self.tokenizer = tiktoken.encoding_for_model("gpt-3.5-turbo")
-        except:
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.tokenizer = get_encoder("gpt-3.5-turbo")
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize text content"""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove empty lines
-        text = re.sub(r'\n\s*\n', '\n', text)
-        
-        # Remove special characters that might interfere with processing
-        text = re.sub(r'[^\w\s\-.,!?():"\'/@#$%&*+=\[\]{}|\\`~<>]', '', text)
-        
-        # Normalize quotes
-        text = re.sub(r'[""]', '"', text)
-        text = re.sub(r'['']', "'", text)
-        
-        return text.strip()
+        return clean_text(text)
     
-    def extract_sections(self, text: str, document_type: str) -> List[Dict[str, Any]]:
+    def extract_sections(self, text: str, document_type: str) -> List['Section']:
         """Extract logical sections from document text"""
         sections = []
         
@@ -53,103 +211,143 @@ class DocumentProcessor:
             sections = self._extract_meeting_sections(text)
         else:
             # Default processing for unknown types
-            sections = [{'content': text, 'section_type': 'general', 'title': 'Content'}]
+            sections = [Section('general', 'Content', text)]
         
         return sections
     
-    def _extract_faq_sections(self, text: str) -> List[Dict[str, Any]]:
+    def _extract_faq_sections(self, text: str) -> List['Section']:
         """Extract FAQ question-answer pairs"""
         sections = []
         
-        # Pattern to match FAQ questions (lines that end with ?)
-        faq_pattern = r'(?:^|\n)(.+\?)\s*\n(.*?)(?=\n.*\?|\n\n|\Z)'
+        # Both FAQ patterns need a line break between question and answer
+        has_lines = '\n' in text
         
-        matches = re.findall(faq_pattern, text, re.MULTILINE | re.DOTALL)
+        # Match FAQ questions (lines that end with ?)
+        matches = FAQ_RE.findall(text) if has_lines else []
         
         for question, answer in matches:
             question = question.strip()
             answer = answer.strip()
             
             if question and answer:
-                sections.append({
-                    'content': f"Q: {question}\nA: {answer}",
-                    'section_type': 'faq',
-                    'title': question,
-                    'question': question,
-                    'answer': answer
-                })
+                sections.append(Section('faq', question, question=question, answer=answer))
         
         # If no FAQs found, try alternative patterns
-        if not sections:
+        if not sections and has_lines:
             # Look for Q: A: patterns
-            qa_pattern = r'(?:^|\n)(?:Q:|Question:)\s*(.+?)\n(?:A:|Answer:)\s*(.*?)(?=\n(?:Q:|Question:)|\n\n|\Z)'
-            matches = re.findall(qa_pattern, text, re.MULTILINE | re.DOTALL)
+            matches = QA_RE.findall(text)
             
             for question, answer in matches:
                 question = question.strip()
                 answer = answer.strip()
                 
                 if question and answer:
-                    sections.append({
-                        'content': f"Q: {question}\nA: {answer}",
-                        'section_type': 'faq',
-                        'title': question,
-                        'question': question,
-                        'answer': answer
-                    })
+                    sections.append(Section('faq', question, question=question, answer=answer))
         
         # If still no sections, treat as general content
         if not sections:
-            sections = [{'content': text, 'section_type': 'general', 'title': 'FAQ Content'}]
+            sections = [Section('general', 'FAQ Content', text)]
         
         return sections
     
-    def _extract_meeting_sections(self, text: str) -> List[Dict[str, Any]]:
+    def _extract_meeting_sections(self, text: str) -> List['Section']:
         """Extract meeting notes sections"""
         sections = []
         
-        # Common meeting section headers
-        section_patterns = [
-            r'(?:^|\n)((?:agenda|topics?|discussion|action items?|decisions?|notes?|summary).*?):\s*\n(.*?)(?=\n(?:agenda|topics?|discussion|action items?|decisions?|notes?|summary)|\n\n|\Z)',
-            r'(?:^|\n)(\d+\.\s*.+?)\n(.*?)(?=\n\d+\.|\n\n|\Z)',
-            r'(?:^|\n)(#{1,3}\s*.+?)\n(.*?)(?=\n#{1,3}|\n\n|\Z)'
-        ]
+        kinds = _header_kinds(text)
         
-        for pattern in section_patterns:
-            matches = re.findall(pattern, text, re.MULTILINE | re.DOTALL | re.IGNORECASE)
+        # Every section pattern needs a line break after its header
+        patterns = [
+            pattern for i, pattern in enumerate(MEETING_SECTION_RES) if i in kinds
+        ] if '\n' in text else []
+        
+        for pattern in patterns:
+            matches = pattern.findall(text)
             
             for title, content in matches:
                 title = title.strip()
                 content = content.strip()
                 
                 if title and content:
-                    sections.append({
-                        'content': f"{title}\n{content}",
-                        'section_type': 'meeting_section',
-                        'title': title
-                    })
+                    sections.append(Section('meeting_section', title, f"{title}\n{content}"))
         
         # If no structured sections found, try to split by common markers
-        if not sections:
+        if not sections and BULLET_KIND in kinds:
             # Split by bullet points or numbered lists
-            bullet_pattern = r'(?:^|\n)((?:[-*•]\s*.+?)(?:\n[-*•].*)*)'
-            matches = re.findall(bullet_pattern, text, re.MULTILINE)
+            matches = BULLET_RE.findall(text)
             
             for match in matches:
                 content = match.strip()
                 if content:
-                    sections.append({
-                        'content': content,
-                        'section_type': 'meeting_bullet',
-                        'title': content.split('\n')[0][:50] + '...'
-                    })
+                    sections.append(Section('meeting_bullet', content.split('\n')[0][:50] + '...', content))
         
         # If still no sections, treat as general content
         if not sections:
-            sections = [{'content': text, 'section_type': 'general', 'title': 'Meeting Notes'}]
+            sections = [Section('general', 'Meeting Notes', text)]
         
         return sections
     
+    def split_section(self, content: str, section_type: str) -> List[str]:
+        """Split section content into chunks of at most config.chunk_size characters"""
+        # Content that already fits is one chunk (a Q/A pair is a coherent unit anyway)
+        if len(content) <= config.chunk_size:
+            return [content] if content.strip() else []
+        
+        sentences = [s for s in SENTENCE_SPLIT_RE.split(content) if s]
+        return self._pack_sentences(sentences)
+    
+    def _pack_sentences(self, sentences: List[str]) -> List[str]:
+        """Greedily group sentences into chunks, repeating trailing sentences as overlap"""
+        chunks = []
+        current = []
+        length = 0
+        
+        for sentence in sentences:
+            if len(sentence) > config.chunk_size:
+                # Oversized sentence: flush and fall back to the character splitter
+                if current:
+                    chunks.append(' '.join(current))
+                    current, length = [], 0
+                chunks.extend(self.text_splitter.split_text(sentence))
+                continue
+            
+            if current and length + 1 + len(sentence) > config.chunk_size:
+                chunks.append(' '.join(current))
+                
+                # Carry trailing sentences that fit in the overlap budget
+                overlap = []
+                overlap_length = 0
+                for previous in reversed(current):
+                    if overlap_length + len(previous) + 1 > config.chunk_overlap:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_length += len(previous) + 1
+                
+                current = overlap
+                length = max(0, overlap_length - 1)
+                
+                # The overlap plus this sentence must still fit; drop the oldest carried sentences
+                while current and length + 1 + len(sentence) > config.chunk_size:
+                    dropped = current.pop(0)
+                    length = length - len(dropped) - 1 if current else 0
+            
+            length += len(sentence) + (1 if current else 0)
+            current.append(sentence)
+        
+        if current:
+            chunks.append(' '.join(current))
+        
+        return chunks
+    
+    def _chunk_cache_key(self, document: Dict[str, Any]) -> bytes:
+        """Chunk cache key for a document's type and content"""
+        content = document.get('content', '')
+        doc_type = document.get('type', 'general')
+        return hashlib.blake2b(
+            f"{doc_type}\0{self.precise_token_count}\0{content}".encode('utf-8'),
+            digest_size=16
+        ).digest()
+    
     def process_document(self, document: Dict[str, Any]) -> List[Document]:
         """Process a single document into chunks"""
         content = document.get('content', '')
@@ -157,8 +355,13 @@ class DocumentProcessor:
         title = document.get('title', 'Untitled')
         doc_id = document.get('document_id', '')
         
-        # Clean the text
-        cleaned_content = self.clean_text(content)
+        cache_key = self._chunk_cache_key(document)
+        cached = _get_cached_chunks(cache_key, document)
+        if cached is not None:
+            return cached
+        
+        # Clean the text, unless the source already did (see google_docs_client)
+        cleaned_content = content if document.get('_preclean') else self.clean_text(content)
         
         # Extract sections
         sections = self.extract_sections(cleaned_content, doc_type)
@@ -167,12 +370,11 @@ class DocumentProcessor:
         chunks = []
         
         for section in sections:
-            section_content = section['content']
-            section_title = section['title']
-            section_type = section['section_type']
+            section_title = section.title
+            section_type = section.section_type
             
             # Split section into smaller chunks if needed
-            section_chunks = self.text_splitter.split_text(section_content)
+            section_chunks = self.split_section(section.content, section_type)
             
             for i, chunk_text in enumerate(section_chunks):
                 # Create metadata for the chunk
@@ -184,52 +386,99 @@ class DocumentProcessor:
                     'section_type': section_type,
                     'chunk_index': i,
                     'total_chunks': len(section_chunks),
-                    'token_count': len(self.tokenizer.encode(chunk_text))
+                    'token_count': 0  # filled in by the batched count below
                 }
                 
                 # Add FAQ-specific metadata
-                if section_type == 'faq' and 'question' in section:
-                    metadata['question'] = section['question']
-                    metadata['answer'] = section['answer']
+                if section_type == 'faq' and section.question is not None:
+                    metadata['question'] = section.question
+                    metadata['answer'] = section.answer
                 
                 chunks.append(Document(
                     page_content=chunk_text,
                     metadata=metadata
                 ))
         
+        # Sections and the cleaned text are no longer needed; drop them before tokenizing
+        del sections, cleaned_content
+        
+        if self.precise_token_count:
+            # Count tokens for all chunks of the document in one batched call
+            token_lists = self.tokenizer.encode_ordinary_batch(
+                [chunk.page_content for chunk in chunks],
+                num_threads=TOKENIZER_THREADS
+            )
+            for chunk, tokens in zip(chunks, token_lists):
+                chunk.metadata['token_count'] = len(tokens)
+        else:
+            for chunk in chunks:
+                chunk.metadata['token_count'] = max(1, len(chunk.page_content) // 4)
+        
         logger.info(f"Processed document '{title}' into {len(chunks)} chunks")
-        return chunks
+        return _cache_chunks(cache_key, chunks)
+    
+    def iter_chunks(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Document]:
+        """Yield chunks document by document, so only one document's chunks are held at a time"""
+        for document in documents:
+            yield from self.process_document(document)
     
     def process_all_documents(self, documents: List[Dict[str, Any]]) -> List[Document]:
         """Process all documents into chunks"""
-        all_chunks = []
+        # Unchanged documents are served from this process's chunk cache; pool workers'
+        # caches die with the pool, so only misses are sent to it and their chunks cached here
+        results: List[Optional[List[Document]]] = []
+        misses = []
+        for i, document in enumerate(documents):
+            cache_key = self._chunk_cache_key(document)
+            results.append(_get_cached_chunks(cache_key, document))
+            if results[i] is None:
+                misses.append((i, cache_key))
         
-        for document in documents:
-            doc_chunks = self.process_document(document)
-            all_chunks.extend(doc_chunks)
+        workers = min(os.cpu_count() or 1, len(misses))
+        if len(misses) >= PARALLEL_MIN_DOCUMENTS and workers >= 2:
+            # Documents are independent CPU-bound regex/split work, so fan them out
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=WORKER_CONTEXT,
+                    initializer=_init_worker,
+                    initargs=(self.precise_token_count,)
+                ) as executor:
+                    worker_results = executor.map(
+                        _process_in_worker, [documents[i] for i, _ in misses], chunksize=4
+                    )
+                    for (i, cache_key), doc_chunks in zip(misses, worker_results):
+                        results[i] = _cache_chunks(cache_key, doc_chunks)
+            except Exception as e:
+                logger.error(f"Parallel document processing failed, falling back to sequential: {str(e)}")
+        
+        for i, _ in misses:
+            if results[i] is None:
+                results[i] = self.process_document(documents[i])
         
+        all_chunks = [chunk for doc_chunks in results for chunk in doc_chunks]
         logger.info(f"Processed {len(documents)} documents into {len(all_chunks)} total chunks")
         return all_chunks
     
     def get_chunk_statistics(self, chunks: List[Document]) -> Dict[str, Any]:
         """Get statistics about the processed chunks"""
         total_chunks = len(chunks)
-        total_tokens = sum(chunk.metadata.get('token_count', 0) for chunk in chunks)
+        total_tokens = 0
         
-        doc_types = {}
-        section_types = {}
+        doc_types = Counter()
+        section_types = Counter()
         
+        # Single pass over the chunks for all three aggregates
         for chunk in chunks:
-            doc_type = chunk.metadata.get('document_type', 'unknown')
-            section_type = chunk.metadata.get('section_type', 'unknown')
-            
-            doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
-            section_types[section_type] = section_types.get(section_type, 0) + 1
+            metadata = chunk.metadata
+            total_tokens += metadata.get('token_count', 0)
+            doc_types[metadata.get('document_type', 'unknown')] += 1
+            section_types[metadata.get('section_type', 'unknown')] += 1
         
         return {
             'total_chunks': total_chunks,
             'total_tokens': total_tokens,
             'average_tokens_per_chunk': total_tokens / total_chunks if total_chunks > 0 else 0,
-            'document_types': doc_types,
-            'section_types': section_types
+            'document_types': dict(doc_types),
+            'section_types': dict(section_types)
         } 
\ No newline at end of file
@@ -1,17 +1,101 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Dict, Any, Optional
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from functools import lru_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
 import logging
 
 from config import config
+from document_processor import clean_text
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+class OrjsonModel(JsonModel):
+    """JSON response model that parses bodies with orjson (large Docs/Sheets payloads)"""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Same fallback as JsonModel: hand back the raw text
+            return content.decode('utf-8') if isinstance(content, bytes) else content
+        
+        if self._data_wrapper:
+            body = body['data']
+        return body
+
+@lru_cache(maxsize=None)
+def _discovery_document(api: str, version: str) -> str:
+    """Read the discovery document bundled with google-api-python-client once per process"""
+    document = get_static_doc(api, version)
+    if document is None:
+        raise ValueError(f"No bundled discovery document for {api} {version}")
+    return document
+
+def build_service(api: str, version: str, **kwargs):
+    """Build an API service from the bundled discovery document, without a network fetch"""
+    if orjson is not None:
+        # None of the Drive, Docs and Sheets APIs wrap responses in a data envelope
+        kwargs.setdefault('model', OrjsonModel(data_wrapper=False))
+    return build_from_document(_discovery_document(api, version), **kwargs)
+
+PAGE_BREAK_TEXT = '\n\n--- Page Break ---\n\n'
+
+def _append_paragraph_text(paragraph: Dict[str, Any], parts: List[str]):
+    """Append the text runs and page breaks of a paragraph to parts"""
+    for element in paragraph.get('elements', ()):
+        text_run = element.get('textRun')
+        if text_run is not None:
+            parts.append(text_run['content'])
+        elif 'pageBreak' in element:
+            parts.append(PAGE_BREAK_TEXT)
+
+def extract_document_text(document: Dict[str, Any]) -> str:
+    """Extract plain text from a Google Docs document structure"""
+    # Collect pieces and join once; repeated += copies the growing text
+    document_title = document.get('title', 'Untitled Document')
+    parts = [f"Document: {document_title}\n\n"]
+    
+    for content_element in document.get('body', {}).get('content', ()):
+        paragraph = content_element.get('paragraph')
+        if paragraph is not None:
+            _append_paragraph_text(paragraph, parts)
+            continue
+        
+        table = content_element.get('table')
+        if table is not None:
+            for row in table.get('tableRows', ()):
+                cell_texts = []
+                for cell in row.get('tableCells', ()):
+                    cell_parts = []
+                    for cell_content in cell.get('content', ()):
+                        cell_paragraph = cell_content.get('paragraph')
+                        if cell_paragraph is not None:
+                            _append_paragraph_text(cell_paragraph, cell_parts)
+                    cell_texts.append("".join(cell_parts))
+                
+                # Trailing empty cells would only leave a dangling separator
+                while cell_texts and not cell_texts[-1]:
+                    cell_texts.pop()
+                parts.append(" | ".join(cell_texts))
+                parts.append("\n")
+            parts.append("\n")
+    
+    return "".join(parts).strip()
+
 class GoogleDocsClient:
     """Client for interacting with Google Docs API"""
     
@@ -20,6 +104,7 @@ class GoogleDocsClient:
     def __init__(self):
         self.service = None
         self.credentials = None
+        self._local = threading.local()
         self._authenticate()
     
     def _authenticate(self):
@@ -47,12 +132,21 @@ class GoogleDocsClient:
                 token.write(creds.to_json())
         
         self.credentials = creds
-        self.service = build('docs', 'v1', credentials=creds)
+        self.service = build_service('docs', 'v1', credentials=creds)
+        self._local.service = self.service
+    
+    def _get_service(self):
+        """Get a Docs service for the current thread (httplib2 is not thread-safe)"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build_service('docs', 'v1', credentials=self.credentials)
+            self._local.service = service
+        return service
     
     def get_document_content(self, document_id: str) -> Optional[Dict[str, Any]]:
         """Get content from a Google Docs document"""
         try:
-            document = self.service.documents().get(documentId=document_id).execute()
+            document = self._get_service().documents().get(documentId=document_id).execute()
             return document
         except HttpError as e:
             logger.error(f"Error fetching document {document_id}: {e}")
@@ -60,54 +154,13 @@ class GoogleDocsClient:
     
     def extract_text_from_document(self, document: Dict[str, Any]) -> str:
         """Extract plain text from a Google Docs document structure"""
-        def extract_text_from_element(element):
-            """Recursively extract text from document elements"""
-            text = ""
-            
-            if 'textRun' in element:
-                text += element['textRun']['content']
-            elif 'pageBreak' in element:
-                text += '\n\n--- Page Break ---\n\n'
-            
-            return text
-        
-        def extract_text_from_paragraph(paragraph):
-            """Extract text from a paragraph"""
-            text = ""
-            if 'elements' in paragraph:
-                for element in paragraph['elements']:
-                    text += extract_text_from_element(element)
-            return text
-        
-        full_text = ""
-        document_title = document.get('title', 'Untitled Document')
-        full_text += f"Document: {document_title}\n\n"
-        
-        if 'body' in document and 'content' in document['body']:
-            for content_element in document['body']['content']:
-                if 'paragraph' in content_element:
-                    paragraph_text = extract_text_from_paragraph(content_element['paragraph'])
-                    full_text += paragraph_text
-                elif 'table' in content_element:
-                    # Handle table content
-                    table = content_element['table']
-                    for row in table.get('tableRows', []):
-                        row_text = ""
-                        for cell in row.get('tableCells', []):
-                            cell_text = ""
-                            for cell_content in cell.get('content', []):
-                                if 'paragraph' in cell_content:
-                                    cell_text += extract_text_from_paragraph(cell_content['paragraph'])
-                            row_text += cell_text + " | "
-                        full_text += row_text.rstrip(" | ") + "\n"
-                    full_text += "\n"
-        
-        return full_text.strip()
+        return extract_document_text(document)
     
-    def get_document_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
-        """Get metadata for a document"""
+    def get_document_metadata(self, document_id: str, document: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Get metadata for a document, reusing an already fetched document when given"""
         try:
-            document = self.service.documents().get(documentId=document_id).execute()
+            if document is None:
+                document = self._get_service().documents().get(documentId=document_id).execute()
             return {
                 'title': document.get('title', 'Untitled Document'),
                 'document_id': document_id,
@@ -121,38 +174,54 @@ class GoogleDocsClient:
     
     def fetch_all_documents(self) -> List[Dict[str, Any]]:
         """Fetch all configured documents with their content and metadata"""
-        documents = []
+        documents = list(self.iter_documents())
         
+        logger.info(f"Successfully fetched {len(documents)} documents")
+        return documents
+    
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """Yield configured documents as soon as each one has been fetched"""
         all_doc_ids = config.get_all_document_ids()
+        if not all_doc_ids:
+            return
         
-        for doc_id in all_doc_ids:
-            logger.info(f"Fetching document: {doc_id}")
-            
-            # Get document content
-            document = self.get_document_content(doc_id)
-            if not document:
-                logger.warning(f"Could not fetch document {doc_id}")
-                continue
-            
-            # Extract text content
-            text_content = self.extract_text_from_document(document)
-            
-            # Get metadata
-            metadata = self.get_document_metadata(doc_id)
-            
-            # Determine document type
-            doc_type = 'faq' if doc_id in config.faq_document_ids else 'meeting_notes'
-            
-            documents.append({
-                'document_id': doc_id,
-                'title': document.get('title', 'Untitled Document'),
-                'content': text_content,
-                'metadata': metadata,
-                'type': doc_type
-            })
+        # Documents are independent, so overlap their request latency
+        workers = max(1, min(config.max_concurrent_requests, len(all_doc_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._fetch_document, doc_id) for doc_id in all_doc_ids]
+            for future in as_completed(futures):
+                document = future.result()
+                if document:
+                    yield document
+    
+    def _fetch_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch one document and build its content and metadata"""
+        logger.info(f"Fetching document: {doc_id}")
         
-        logger.info(f"Successfully fetched {len(documents)} documents")
-        return documents
+        # Get document content
+        document = self.get_document_content(doc_id)
+        if not document:
+            logger.warning(f"Could not fetch document {doc_id}")
+            return None
+        
+        # Extract and clean text content right away, so only the (smaller)
+        # cleaned text is held and handed to the processor
+        text_content = clean_text(self.extract_text_from_document(document))
+        
+        # Metadata comes from the same response
+        metadata = self.get_document_metadata(doc_id, document)
+        
+        # Determine document type
+        doc_type = 'faq' if doc_id in config.faq_document_ids else 'meeting_notes'
+        
+        return {
+            'document_id': doc_id,
+            'title': document.get('title', 'Untitled Document'),
+            'content': text_content,
+            'metadata': metadata,
+            'type': doc_type,
+            '_preclean': True
+        }
     
     def test_connection(self) -> bool:
         """Test the Google Docs API connection"""
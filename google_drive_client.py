@@ -1,23 +1,75 @@
 import os
 import json
-import io
 import mimetypes
-from typing import List, Dict, Any, Optional, Set
-from google.auth.transport.requests import Request
+import queue
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Set, Iterator
+from google.auth.transport.requests import Request, AuthorizedSession
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 import logging
-from datetime import datetime, timedelta
 import requests
 import re
+from cachetools import TTLCache
 
 from config import config
+from google_docs_client import build_service, extract_document_text
 
 logger = logging.getLogger(__name__)
 
+# In-memory cache bounds; entries also expire after an hour
+CACHE_MAX_ENTRIES = 1024
+CONTENT_CACHE_MAX_ENTRIES = 256
+CACHE_TTL_SECONDS = 3600
+
+# The on-disk document cache is trimmed to this size, least recently used first
+DOCUMENT_CACHE_MAX_BYTES = 1 << 30
+
+# Document type indicators, checked in order: FAQ name, meeting name, FAQ content, meeting content
+FAQ_NAME_RE = re.compile(r'faq|frequently asked|questions|q&a|help', re.IGNORECASE)
+MEETING_NAME_RE = re.compile(r'meeting|notes|minutes|agenda|standup|retrospective', re.IGNORECASE)
+FAQ_CONTENT_RE = re.compile(r'(^|\n)\s*Q\s*[:?]|question\s*[:?]', re.IGNORECASE)
+MEETING_CONTENT_RE = re.compile(r'agenda|action items|decisions|attendees|meeting', re.IGNORECASE)
+
+DRIVE_FILES_URL = 'https://www.googleapis.com/drive/v3/files'
+
+# Drive accepts at most 100 calls per batch request
+DRIVE_BATCH_SIZE = 100
+
+# How long the listing thread waits on a full page queue before checking whether the caller stopped
+PAGE_PUT_TIMEOUT = 0.5
+
+# Content indicators are looked for in the start of the document only, which
+# also keeps the memoization key small
+CLASSIFY_PREFIX_CHARS = 8192
+
+@lru_cache(maxsize=4096)
+def classify_document(file_name: str, content_prefix: str) -> str:
+    """Determine document type based on filename and the start of the content"""
+    # Check for FAQ indicators
+    if FAQ_NAME_RE.search(file_name):
+        return 'faq'
+    
+    # Check for meeting notes indicators
+    if MEETING_NAME_RE.search(file_name):
+        return 'meeting_notes'
+    
+    # Check content for FAQ patterns (case-insensitive, without a lowered copy of the content)
+    if FAQ_CONTENT_RE.search(content_prefix):
+        return 'faq'
+    
+    # Check content for meeting patterns
+    if MEETING_CONTENT_RE.search(content_prefix):
+        return 'meeting_notes'
+    
+    # Default to general
+    return 'general'
+
 class GoogleDriveClient:
     """Client for accessing all Google Drive content"""
     
@@ -40,13 +92,39 @@ class GoogleDriveClient:
         'application/msword': 'doc',
     }
     
+    # Content download method for each supported type
+    CONTENT_HANDLERS = {
+        'application/vnd.google-apps.document': '_get_google_doc_content',
+        'application/vnd.google-apps.spreadsheet': '_get_google_sheet_content',
+        'application/vnd.google-apps.presentation': '_get_google_slides_content',
+        'application/pdf': '_get_pdf_content',
+        'text/plain': '_get_text_content',
+        'text/markdown': '_get_text_content',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '_get_doc_content',
+        'application/msword': '_get_doc_content',
+    }
+    
+    # Only the file fields the pipeline reads
+    FILES_FIELDS = "nextPageToken, files(id, name, mimeType, modifiedTime)"
+    
+    # Static query fragments, built once
+    SUPPORTED_FILES_QUERY = "(" + " or ".join(f"mimeType = '{mime}'" for mime in SUPPORTED_TYPES) + ") and trashed = false"
+    FOLDERS_QUERY = "mimeType = 'application/vnd.google-apps.folder' and trashed = false"
+    
     def __init__(self):
         self.drive_service = None
         self.docs_service = None
         self.sheets_service = None
         self.credentials = None
-        self.cache = {}
-        self.cache_expiry = timedelta(hours=1)
+        self.http_session = None
+        # Bounded TTL caches; extracted file content (potentially large strings)
+        # is kept apart from listings so it cannot evict them
+        self.cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+        self.content_cache = TTLCache(maxsize=CONTENT_CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        # Bounds in-flight content requests across all concurrent fetches
+        self._request_slots = threading.Semaphore(config.max_concurrent_requests)
         self._authenticate()
     
     def _authenticate(self):
@@ -75,33 +153,53 @@ class GoogleDriveClient:
         
         self.credentials = creds
         
-        # Build service objects
-        self.drive_service = build('drive', 'v3', credentials=creds)
-        self.docs_service = build('docs', 'v1', credentials=creds)
-        self.sheets_service = build('sheets', 'v4', credentials=creds)
+        # Build service objects on one keep-alive transport so their
+        # connections to *.googleapis.com are reused across calls
+        http = self._authorized_http()
+        self.drive_service = build_service('drive', 'v3', http=http)
+        self.docs_service = build_service('docs', 'v1', http=http)
+        self.sheets_service = build_service('sheets', 'v4', http=http)
+        
+        # Shared keep-alive connection pool for file downloads; thread-safe,
+        # so concurrent downloads reuse TCP/TLS connections
+        self.http_session = AuthorizedSession(creds)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config.max_concurrent_requests
+        )
+        self.http_session.mount('https://', adapter)
         
         logger.info("Google Drive authentication successful")
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if cache entry is still valid"""
-        if cache_key not in self.cache:
-            return False
-        
-        cache_entry = self.cache[cache_key]
-        return datetime.now() - cache_entry['timestamp'] < self.cache_expiry
+    def close(self):
+        """Close pooled HTTP connections"""
+        if self.http_session:
+            self.http_session.close()
+    
+    def _authorized_http(self) -> AuthorizedHttp:
+        """Create an authorized keep-alive httplib2 transport"""
+        return AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=config.request_timeout))
+    
+    def _thread_service(self, api: str, version: str):
+        """Get an API service for the current thread (httplib2 connections are not thread-safe)"""
+        local = self._local.__dict__
+        services = local.setdefault('services', {})
+        if (api, version) not in services:
+            # All services of a thread share its transport and connections
+            if 'http' not in local:
+                local['http'] = self._authorized_http()
+            services[(api, version)] = build_service(api, version, http=local['http'])
+        return services[(api, version)]
     
-    def _get_from_cache(self, cache_key: str) -> Optional[Any]:
-        """Get data from cache if valid"""
-        if self._is_cache_valid(cache_key):
-            return self.cache[cache_key]['data']
-        return None
+    def _get_from_cache(self, cache_key: str, cache: Optional[TTLCache] = None) -> Optional[Any]:
+        """Get data from cache if present and not expired"""
+        with self._cache_lock:
+            return (self.cache if cache is None else cache).get(cache_key)
     
-    def _set_cache(self, cache_key: str, data: Any):
+    def _set_cache(self, cache_key: str, data: Any, cache: Optional[TTLCache] = None):
         """Set data in cache"""
-        self.cache[cache_key] = {
-            'data': data,
-            'timestamp': datetime.now()
-        }
+        with self._cache_lock:
+            (self.cache if cache is None else cache)[cache_key] = data
     
     def list_files(self, folder_id: str = None, file_type: str = None, query: str = None) -> List[Dict[str, Any]]:
         """List files in Google Drive"""
@@ -111,40 +209,11 @@ class GoogleDriveClient:
             if cached_result:
                 return cached_result
             
-            # Build query
-            q_parts = []
-            
-            if folder_id:
-                q_parts.append(f"'{folder_id}' in parents")
-            
-            if file_type:
-                if file_type in self.SUPPORTED_TYPES:
-                    q_parts.append(f"mimeType = '{file_type}'")
-                else:
-                    # Search by file extension
-                    q_parts.append(f"name contains '.{file_type}'")
-            
-            if query:
-                q_parts.append(f"name contains '{query}'")
-            
-            # Only get files we can process
-            supported_types = list(self.SUPPORTED_TYPES.keys())
-            mime_query = " or ".join([f"mimeType = '{mime}'" for mime in supported_types])
-            q_parts.append(f"({mime_query})")
-            
-            # Exclude trashed files
-            q_parts.append("trashed = false")
-            
-            query_string = " and ".join(q_parts)
-            
-            # Execute query
-            results = self.drive_service.files().list(
-                q=query_string,
-                fields="files(id, name, mimeType, parents, modifiedTime, size, webViewLink)",
-                pageSize=1000
-            ).execute()
-            
-            files = results.get('files', [])
+            # Execute query; only the fields the pipeline reads are requested
+            files = self._list_all(
+                q=self._files_query(folder_id, file_type, query),
+                fields=self.FILES_FIELDS
+            )
             
             # Cache the result
             self._set_cache(cache_key, files)
@@ -156,6 +225,106 @@ class GoogleDriveClient:
             logger.error(f"Error listing files: {e}")
             return []
     
+    def _files_query(self, folder_id: str = None, file_type: str = None, query: str = None) -> str:
+        """Build the files.list query for supported files"""
+        q_parts = []
+        
+        if folder_id:
+            q_parts.append(f"'{folder_id}' in parents")
+        
+        if file_type:
+            if file_type in self.SUPPORTED_TYPES:
+                q_parts.append(f"mimeType = '{file_type}'")
+            else:
+                # Search by file extension
+                q_parts.append(f"name contains '.{file_type}'")
+        
+        if query:
+            q_parts.append(f"name contains '{query}'")
+        
+        # Only get files we can process, excluding trashed files
+        q_parts.append(self.SUPPORTED_FILES_QUERY)
+        
+        return " and ".join(q_parts)
+    
+    def iter_file_pages(self, folder_id: str = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield list_files results page by page, fetching the next page in the background
+        
+        While the caller downloads the files of one page, the following page
+        is already being listed. A complete listing is cached like list_files.
+        """
+        cache_key = f"files_{folder_id}_None_None"
+        cached_result = self._get_from_cache(cache_key)
+        if cached_result:
+            yield cached_result
+            return
+        
+        pages = queue.Queue(maxsize=2)
+        done = object()
+        stop = threading.Event()
+        errors = []
+        
+        def put(item) -> bool:
+            """Queue an item for the caller; False once the caller has stopped iterating"""
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=PAGE_PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            try:
+                # The listing thread uses its own service; httplib2 is not thread-safe
+                files_api = self._thread_service('drive', 'v3').files()
+                request = files_api.list(q=self._files_query(folder_id), fields=self.FILES_FIELDS, pageSize=1000)
+                while request is not None:
+                    response = request.execute()
+                    if not put(response.get('files', [])):
+                        return
+                    request = files_api.list_next(request, response)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                put(done)
+        
+        threading.Thread(target=produce, daemon=True).start()
+        
+        files = []
+        try:
+            while True:
+                page = pages.get()
+                if page is done:
+                    break
+                files.extend(page)
+                yield page
+        finally:
+            # If the caller stopped early, release a listing thread blocked on the full queue
+            stop.set()
+            while True:
+                try:
+                    pages.get_nowait()
+                except queue.Empty:
+                    break
+        
+        if errors:
+            logger.error(f"Error listing files: {errors[0]}")
+            return
+        
+        self._set_cache(cache_key, files)
+        logger.info(f"Found {len(files)} files in Drive")
+    
+    def _list_all(self, **kwargs) -> List[Dict[str, Any]]:
+        """Run a files.list query and follow nextPageToken until every page is read"""
+        files = []
+        request = self.drive_service.files().list(pageSize=1000, **kwargs)
+        while request is not None:
+            response = request.execute()
+            files.extend(response.get('files', []))
+            request = self.drive_service.files().list_next(request, response)
+        return files
+    
     def get_folder_structure(self, folder_id: str = None) -> Dict[str, Any]:
         """Get folder structure from Google Drive"""
         try:
@@ -165,15 +334,11 @@ class GoogleDriveClient:
                 return cached_result
             
             # Get folders
-            query = "mimeType = 'application/vnd.google-apps.folder' and trashed = false"
+            query = self.FOLDERS_QUERY
             if folder_id:
                 query += f" and '{folder_id}' in parents"
             
-            folders = self.drive_service.files().list(
-                q=query,
-                fields="files(id, name, parents)",
-                pageSize=1000
-            ).execute().get('files', [])
+            folders = self._list_all(q=query, fields="nextPageToken, files(id, name, parents)")
             
             # Build folder structure
             structure = {
@@ -190,31 +355,93 @@ class GoogleDriveClient:
             logger.error(f"Error getting folder structure: {e}")
             return {'folders': [], 'files': []}
     
-    def get_file_content(self, file_id: str, mime_type: str) -> Optional[str]:
-        """Get content from a file based on its type"""
+    def _document_cache_file(self, file_id: str) -> str:
+        """Path of the on-disk extracted text cache for a file"""
+        return os.path.join(config.document_cache_path, f"{file_id}.json")
+    
+    def _get_from_document_cache(self, file_id: str, modified_time: str) -> Optional[str]:
+        """Get extracted text from disk if it was stored for this file revision"""
+        path = self._document_cache_file(file_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if entry.get('modified_time') != modified_time:
+            return None
+        
+        # The file's mtime records its last use for prune_document_cache
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get('content')
+    
+    def _set_document_cache(self, file_id: str, modified_time: str, content: str):
+        """Store extracted text on disk for this file revision"""
+        path = self._document_cache_file(file_id)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'modified_time': modified_time, 'content': content}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write document cache for {file_id}: {e}")
+    
+    def prune_document_cache(self, max_bytes: int = DOCUMENT_CACHE_MAX_BYTES):
+        """Delete least recently used document cache entries until the cache fits in max_bytes"""
+        try:
+            entries = [
+                entry for entry in os.scandir(config.document_cache_path)
+                if entry.is_file() and entry.name.endswith('.json')
+            ]
+        except OSError as e:
+            logger.warning(f"Could not scan document cache: {e}")
+            return
+        
+        stats = sorted(((entry.stat(), entry.path) for entry in entries), key=lambda item: item[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in stats)
+        
+        for stat, path in stats:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= stat.st_size
+            except OSError as e:
+                logger.warning(f"Could not remove document cache entry {path}: {e}")
+    
+    def get_file_content(self, file_id: str, mime_type: str, modified_time: Optional[str] = None,
+                         refresh: bool = False) -> Optional[str]:
+        """Get content from a file based on its type
+        
+        When modified_time is given, extracted text is also cached on disk per
+        revision so unchanged files are not downloaded again across runs.
+        """
         try:
             cache_key = f"file_content_{file_id}"
-            cached_result = self._get_from_cache(cache_key)
+            cached_result = self._get_from_cache(cache_key, self.content_cache)
             if cached_result:
                 return cached_result
             
+            if modified_time and not refresh:
+                cached_result = self._get_from_document_cache(file_id, modified_time)
+                if cached_result:
+                    self._set_cache(cache_key, cached_result, self.content_cache)
+                    return cached_result
+            
             content = None
             
-            if mime_type == 'application/vnd.google-apps.document':
-                content = self._get_google_doc_content(file_id)
-            elif mime_type == 'application/vnd.google-apps.spreadsheet':
-                content = self._get_google_sheet_content(file_id)
-            elif mime_type == 'application/vnd.google-apps.presentation':
-                content = self._get_google_slides_content(file_id)
-            elif mime_type == 'application/pdf':
-                content = self._get_pdf_content(file_id)
-            elif mime_type in ['text/plain', 'text/markdown']:
-                content = self._get_text_content(file_id)
-            elif mime_type in ['application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'application/msword']:
-                content = self._get_doc_content(file_id)
+            handler = self.CONTENT_HANDLERS.get(mime_type)
+            if handler:
+                with self._request_slots:
+                    content = getattr(self, handler)(file_id)
             
             if content:
-                self._set_cache(cache_key, content)
+                self._set_cache(cache_key, content, self.content_cache)
+                if modified_time:
+                    self._set_document_cache(file_id, modified_time, content)
             
             return content
             
@@ -225,7 +452,7 @@ class GoogleDriveClient:
     def _get_google_doc_content(self, file_id: str) -> Optional[str]:
         """Get content from Google Doc"""
         try:
-            document = self.docs_service.documents().get(documentId=file_id).execute()
+            document = self._thread_service('docs', 'v1').documents().get(documentId=file_id).execute()
             return self._extract_text_from_google_doc(document)
         except HttpError as e:
             logger.error(f"Error getting Google Doc content: {e}")
@@ -233,100 +460,69 @@ class GoogleDriveClient:
     
     def _extract_text_from_google_doc(self, document: Dict[str, Any]) -> str:
         """Extract text from Google Doc structure"""
-        def extract_text_from_element(element):
-            text = ""
-            if 'textRun' in element:
-                text += element['textRun']['content']
-            elif 'pageBreak' in element:
-                text += '\n\n--- Page Break ---\n\n'
-            return text
-        
-        def extract_text_from_paragraph(paragraph):
-            text = ""
-            if 'elements' in paragraph:
-                for element in paragraph['elements']:
-                    text += extract_text_from_element(element)
-            return text
-        
-        full_text = ""
-        document_title = document.get('title', 'Untitled Document')
-        full_text += f"Document: {document_title}\n\n"
-        
-        if 'body' in document and 'content' in document['body']:
-            for content_element in document['body']['content']:
-                if 'paragraph' in content_element:
-                    paragraph_text = extract_text_from_paragraph(content_element['paragraph'])
-                    full_text += paragraph_text
-                elif 'table' in content_element:
-                    table = content_element['table']
-                    for row in table.get('tableRows', []):
-                        row_text = ""
-                        for cell in row.get('tableCells', []):
-                            cell_text = ""
-                            for cell_content in cell.get('content', []):
-                                if 'paragraph' in cell_content:
-                                    cell_text += extract_text_from_paragraph(cell_content['paragraph'])
-                            row_text += cell_text + " | "
-                        full_text += row_text.rstrip(" | ") + "\n"
-                    full_text += "\n"
-        
-        return full_text.strip()
+        return extract_document_text(document)
     
     def _get_google_sheet_content(self, file_id: str) -> Optional[str]:
         """Get content from Google Sheet"""
         try:
-            sheet = self.sheets_service.spreadsheets().get(spreadsheetId=file_id).execute()
+            sheets_service = self._thread_service('sheets', 'v4')
+            sheet = sheets_service.spreadsheets().get(spreadsheetId=file_id).execute()
             title = sheet.get('properties', {}).get('title', 'Untitled Sheet')
             
-            content = f"Spreadsheet: {title}\n\n"
+            # Collect pieces and join once; repeated += copies the growing text
+            parts = [f"Spreadsheet: {title}\n\n"]
             
             # Get all sheets
             sheets = sheet.get('sheets', [])
+            sheet_titles = [sheet_info.get('properties', {}).get('title', 'Untitled') for sheet_info in sheets]
             
-            for sheet_info in sheets:
-                sheet_title = sheet_info.get('properties', {}).get('title', 'Untitled')
-                content += f"Sheet: {sheet_title}\n"
-                
-                # Get sheet data
-                range_name = f"'{sheet_title}'"
-                result = self.sheets_service.spreadsheets().values().get(
+            # Get the data of every sheet in one request; quotes in titles are doubled in A1 notation
+            value_ranges = []
+            if sheet_titles:
+                result = sheets_service.spreadsheets().values().batchGet(
                     spreadsheetId=file_id,
-                    range=range_name
+                    ranges=["'" + sheet_title.replace("'", "''") + "'" for sheet_title in sheet_titles]
                 ).execute()
+                value_ranges = result.get('valueRanges', [])
+            
+            for sheet_title, value_range in zip(sheet_titles, value_ranges):
+                parts.append(f"Sheet: {sheet_title}\n")
                 
-                values = result.get('values', [])
-                
-                for row in values:
-                    content += " | ".join(str(cell) for cell in row) + "\n"
+                for row in value_range.get('values', []):
+                    parts.append(" | ".join(map(str, row)))
+                    parts.append("\n")
                 
-                content += "\n"
+                parts.append("\n")
             
-            return content
+            return "".join(parts)
             
         except HttpError as e:
             logger.error(f"Error getting Google Sheet content: {e}")
             return None
     
+    def _download_text(self, file_id: str, export: bool) -> str:
+        """Download a file as UTF-8 text in a single request on the pooled session
+        
+        Google-native files are exported as text/plain; other files are
+        downloaded as stored. Raises requests.RequestException on failure.
+        """
+        if export:
+            url = f"{DRIVE_FILES_URL}/{file_id}/export"
+            params = {'mimeType': 'text/plain'}
+        else:
+            url = f"{DRIVE_FILES_URL}/{file_id}"
+            params = {'alt': 'media'}
+        
+        response = self.http_session.get(url, params=params, timeout=config.request_timeout)
+        response.raise_for_status()
+        return response.content.decode('utf-8')
+    
     def _get_google_slides_content(self, file_id: str) -> Optional[str]:
         """Get content from Google Slides"""
         try:
             # For slides, we'll export as text
-            request = self.drive_service.files().export_media(
-                fileId=file_id,
-                mimeType='text/plain'
-            )
-            
-            file_io = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_io, request)
-            done = False
-            
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            content = file_io.getvalue().decode('utf-8')
-            return content
-            
-        except HttpError as e:
+            return self._download_text(file_id, export=True)
+        except requests.RequestException as e:
             logger.error(f"Error getting Google Slides content: {e}")
             return None
     
@@ -334,41 +530,16 @@ class GoogleDriveClient:
         """Get content from PDF file"""
         try:
             # For PDFs, we'll try to export as text if possible
-            request = self.drive_service.files().export_media(
-                fileId=file_id,
-                mimeType='text/plain'
-            )
-            
-            file_io = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_io, request)
-            done = False
-            
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            content = file_io.getvalue().decode('utf-8')
-            return content
-            
-        except HttpError as e:
+            return self._download_text(file_id, export=True)
+        except requests.RequestException as e:
             logger.warning(f"Cannot extract text from PDF {file_id}: {e}")
             return None
     
     def _get_text_content(self, file_id: str) -> Optional[str]:
         """Get content from text file"""
         try:
-            request = self.drive_service.files().get_media(fileId=file_id)
-            
-            file_io = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_io, request)
-            done = False
-            
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            content = file_io.getvalue().decode('utf-8')
-            return content
-            
-        except HttpError as e:
+            return self._download_text(file_id, export=False)
+        except requests.RequestException as e:
             logger.error(f"Error getting text content: {e}")
             return None
     
@@ -376,22 +547,8 @@ class GoogleDriveClient:
         """Get content from Word document"""
         try:
             # Export as text
-            request = self.drive_service.files().export_media(
-                fileId=file_id,
-                mimeType='text/plain'
-            )
-            
-            file_io = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_io, request)
-            done = False
-            
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            content = file_io.getvalue().decode('utf-8')
-            return content
-            
-        except HttpError as e:
+            return self._download_text(file_id, export=True)
+        except requests.RequestException as e:
             logger.error(f"Error getting Word document content: {e}")
             return None
     
@@ -400,46 +557,7 @@ class GoogleDriveClient:
         try:
             logger.info("Fetching all documents from Google Drive...")
             
-            if force_refresh:
-                self.cache.clear()
-            
-            documents = []
-            
-            # If specific folder IDs are provided, search within those
-            if folder_ids:
-                for folder_id in folder_ids:
-                    files = self.list_files(folder_id=folder_id)
-                    documents.extend(self._process_files(files))
-            else:
-                # Get all supported files
-                files = self.list_files()
-                documents.extend(self._process_files(files))
-            
-            # Also check configured document IDs from environment
-            legacy_doc_ids = config.faq_document_ids + config.meeting_notes_document_ids
-            for doc_id in legacy_doc_ids:
-                if doc_id not in [d['document_id'] for d in documents]:
-                    try:
-                        # Try to get this document
-                        file_info = self.drive_service.files().get(
-                            fileId=doc_id,
-                            fields="id, name, mimeType, parents, modifiedTime"
-                        ).execute()
-                        
-                        content = self.get_file_content(doc_id, file_info['mimeType'])
-                        if content:
-                            doc_type = 'faq' if doc_id in config.faq_document_ids else 'meeting_notes'
-                            documents.append({
-                                'document_id': doc_id,
-                                'title': file_info.get('name', 'Untitled'),
-                                'content': content,
-                                'type': doc_type,
-                                'mime_type': file_info['mimeType'],
-                                'modified_time': file_info.get('modifiedTime'),
-                                'source': 'legacy_config'
-                            })
-                    except Exception as e:
-                        logger.warning(f"Could not fetch legacy document {doc_id}: {e}")
+            documents = list(self.iter_documents(folder_ids=folder_ids, force_refresh=force_refresh))
             
             logger.info(f"Successfully fetched {len(documents)} documents from Google Drive")
             return documents
@@ -448,59 +566,129 @@ class GoogleDriveClient:
             logger.error(f"Error fetching documents: {e}")
             return []
     
-    def _process_files(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Process a list of files and extract content"""
-        documents = []
+    def iter_documents(self, folder_ids: List[str] = None, force_refresh: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield accessible documents from Google Drive as their content is downloaded"""
+        if force_refresh:
+            with self._cache_lock:
+                self.cache.clear()
+                self.content_cache.clear()
         
-        for file_info in files:
-            file_id = file_info['id']
-            file_name = file_info['name']
-            mime_type = file_info['mimeType']
-            
-            # Get file content
-            content = self.get_file_content(file_id, mime_type)
-            
-            if content:
-                # Determine document type based on name/content
-                doc_type = self._determine_document_type(file_name, content)
-                
-                documents.append({
-                    'document_id': file_id,
-                    'title': file_name,
-                    'content': content,
-                    'type': doc_type,
-                    'mime_type': mime_type,
-                    'modified_time': file_info.get('modifiedTime'),
-                    'source': 'google_drive'
-                })
-        
-        return documents
+        seen_ids = set()
+        
+        # If specific folder IDs are provided, search within those; otherwise get all supported files.
+        # Listing pages are prefetched while the current page's files download
+        for folder_id in folder_ids or [None]:
+            for files in self.iter_file_pages(folder_id):
+                for document in self._process_files(files, refresh=force_refresh):
+                    seen_ids.add(document['document_id'])
+                    yield document
+        
+        # Also check configured document IDs from environment
+        legacy_doc_ids = [
+            doc_id for doc_id in dict.fromkeys(config.faq_document_ids + config.meeting_notes_document_ids)
+            if doc_id not in seen_ids
+        ]
+        
+        # One batched metadata lookup, then the same concurrent download as listed files;
+        # IDs whose metadata failed were already logged by get_files_metadata
+        legacy_files = self.get_files_metadata(legacy_doc_ids)
+        yield from self._process_files(
+            [legacy_files[doc_id] for doc_id in legacy_doc_ids if doc_id in legacy_files],
+            refresh=force_refresh,
+            source='legacy_config'
+        )
+        
+        self.prune_document_cache()
     
-    def _determine_document_type(self, file_name: str, content: str) -> str:
-        """Determine document type based on filename and content"""
-        file_name_lower = file_name.lower()
-        content_lower = content.lower()
+    def get_files_metadata(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get metadata for many files using batch requests of up to DRIVE_BATCH_SIZE calls"""
+        results = {}
         
-        # Check for FAQ indicators
-        faq_indicators = ['faq', 'frequently asked', 'questions', 'q&a', 'help']
-        if any(indicator in file_name_lower for indicator in faq_indicators):
-            return 'faq'
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                logger.warning(f"Could not fetch metadata for {request_id}: {exception}")
+            else:
+                results[request_id] = response
+        
+        unique_ids = list(dict.fromkeys(file_ids))
+        for start in range(0, len(unique_ids), DRIVE_BATCH_SIZE):
+            batch = self.drive_service.new_batch_http_request(callback=on_response)
+            for file_id in unique_ids[start:start + DRIVE_BATCH_SIZE]:
+                batch.add(
+                    self.drive_service.files().get(
+                        fileId=file_id,
+                        fields="id, name, mimeType, parents, modifiedTime"
+                    ),
+                    request_id=file_id
+                )
+            
+            try:
+                batch.execute()
+            except HttpError as e:
+                logger.error(f"Error fetching file metadata batch: {e}")
+        
+        return results
+    
+    def _process_files(self, files: List[Dict[str, Any]], refresh: bool = False,
+                       source: str = 'google_drive') -> Iterator[Dict[str, Any]]:
+        """Download files concurrently and yield documents as their content arrives"""
+        if not files:
+            return
         
-        # Check for meeting notes indicators
-        meeting_indicators = ['meeting', 'notes', 'minutes', 'agenda', 'standup', 'retrospective']
-        if any(indicator in file_name_lower for indicator in meeting_indicators):
-            return 'meeting_notes'
+        workers = min(config.max_concurrent_requests, len(files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Get file content, reusing the disk cache for unchanged revisions
+            futures = {
+                executor.submit(
+                    self.get_file_content,
+                    file_info['id'], file_info['mimeType'],
+                    modified_time=file_info.get('modifiedTime'),
+                    refresh=refresh
+                ): file_info
+                for file_info in files
+            }
+            
+            try:
+                for future in as_completed(futures):
+                    file_info = futures[future]
+                    document = self._build_document(file_info, future.result(), source)
+                    if document:
+                        yield document
+            finally:
+                # If the caller stops early, skip the downloads that have not started
+                for future in futures:
+                    future.cancel()
+    
+    def _build_document(self, file_info: Dict[str, Any], content: Optional[str],
+                        source: str = 'google_drive') -> Optional[Dict[str, Any]]:
+        """Build a document dict for a downloaded file, or None if it has no content"""
+        file_id = file_info['id']
+        file_name = file_info.get('name', 'Untitled')
+        mime_type = file_info['mimeType']
         
-        # Check content for FAQ patterns
-        if re.search(r'(^|\n)\s*Q\s*[:?]|question\s*[:?]', content_lower):
-            return 'faq'
+        if not content:
+            return None
         
-        # Check content for meeting patterns
-        if re.search(r'(agenda|action items|decisions|attendees|meeting)', content_lower):
-            return 'meeting_notes'
+        if source == 'legacy_config':
+            # Configured IDs carry their type in which list they came from
+            doc_type = 'faq' if file_id in config.faq_document_ids else 'meeting_notes'
+        else:
+            # Determine document type based on name/content
+            doc_type = self._determine_document_type(file_name, content)
         
-        # Default to general
-        return 'general'
+        return {
+            'document_id': file_id,
+            'title': file_name,
+            'content': content,
+            'type': doc_type,
+            'mime_type': mime_type,
+            'modified_time': file_info.get('modifiedTime'),
+            'source': source
+        }
+    
+    def _determine_document_type(self, file_name: str, content: str) -> str:
+        """Determine document type based on filename and content"""
+        return classify_document(file_name, content[:CLASSIFY_PREFIX_CHARS])
     
     def test_connection(self) -> bool:
         """Test the Google Drive connection"""
@@ -1,31 +1,128 @@
 import os
+import base64
+import asyncio
+import hashlib
 import logging
+import shutil
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 import chromadb
 from chromadb.config import Settings
+from openai import AsyncOpenAI, OpenAI
 from langchain.schema import Document
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
 import numpy as np
+import orjson
 from datetime import datetime
 
 from config import config
 
 logger = logging.getLogger(__name__)
 
+# Texts per embeddings request, and how many requests run concurrently
+EMBEDDING_REQUEST_SIZE = 256
+EMBEDDING_CONCURRENCY = 8
+
+# Distinct query strings whose embeddings are kept in memory
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+# SQLite host parameter limit for embedding cache lookups
+EMBEDDING_CACHE_LOOKUP_SIZE = 500
+
+# All metadata rows (including the stored document text) of one source document's chunks
+DOCUMENT_CHUNKS_SQL = """
+    SELECT m.id, m.key, m.string_value, m.int_value, m.float_value, m.bool_value
+    FROM embedding_metadata m
+    WHERE m.id IN (
+        SELECT d.id
+        FROM embedding_metadata d
+        JOIN embeddings e ON e.id = d.id
+        JOIN segments s ON s.id = e.segment_id
+        WHERE s.collection = ? AND d.key = 'document_id' AND d.string_value = ?
+    )
+    ORDER BY m.id
+"""
+
+# Metadata key under which Chroma's SQLite segment stores the document text
+CHROMA_DOCUMENT_KEY = 'chroma:document'
+
+# Per-collection counts of the metadata keys reported by get_collection_stats
+METADATA_COUNTS_SQL = """
+    SELECT m.key, m.string_value, COUNT(*)
+    FROM embedding_metadata m
+    JOIN embeddings e ON e.id = m.id
+    JOIN segments s ON s.id = e.segment_id
+    WHERE s.collection = ? AND m.key IN ('document_type', 'section_type')
+    GROUP BY m.key, m.string_value
+"""
+
+def _decode_embeddings(response) -> np.ndarray:
+    """Decode a base64 embeddings response into an (n, dim) float32 array in input order"""
+    return np.stack([
+        np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+        if isinstance(item.embedding, str) else np.asarray(item.embedding, dtype=np.float32)
+        for item in sorted(response.data, key=lambda item: item.index)
+    ])
+
+@dataclass(slots=True)
+class ContextItem:
+    """A retrieved chunk with its relevance score, as used to build answers"""
+    content: str
+    metadata: Dict[str, Any]
+    relevance_score: float
+    document_type: Optional[str]
+    document_title: Optional[str]
+    section_type: Optional[str]
+    question: Optional[str] = None
+    answer: Optional[str] = None
+
+def _copy_file(src: str, dst: str) -> str:
+    """Copy a file in the kernel (reflinked on filesystems that support it)"""
+    try:
+        with open(src, 'rb') as source, open(dst, 'wb') as target:
+            remaining = os.fstat(source.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(source.fileno(), target.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        shutil.copystat(src, dst)
+    except (AttributeError, OSError):
+        # copy_file_range is Linux-only and unsupported across some filesystems
+        shutil.copy2(src, dst)
+    return dst
+
 class KnowledgeBase:
     """Vector-based knowledge base for document storage and retrieval"""
     
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=config.openai_api_key,
-            model=config.embedding_model
-        )
+        self.openai_client = OpenAI(api_key=config.openai_api_key)
         
-        self.vector_store = None
+        self.chroma_client = None
+        self.collection = None
         self.collection_name = "leadership_kb"
         self.persist_directory = config.vector_store_path
         
+        # Embeddings keyed by sha256 of the embedding model and chunk text, kept across
+        # knowledge base rebuilds; changing the model never returns the old model's vectors.
+        # Vectors are stored as float16, half the size of float32 at no retrieval cost
+        self._embedding_cache = sqlite3.connect(config.embedding_cache_path, check_same_thread=False)
+        self._embedding_cache.execute("CREATE TABLE IF NOT EXISTS cache_f16 (h BLOB PRIMARY KEY, v BLOB)")
+        # Rows of the earlier float32 table were keyed by text alone and are never read
+        self._embedding_cache.execute("DROP TABLE IF EXISTS cache")
+        self._embedding_cache.commit()
+        self._embedding_cache_lock = threading.Lock()
+        
+        # Lazily opened read-only connection to Chroma's SQLite store for direct chunk lookups
+        self._metadata_db = None
+        self._metadata_db_lock = threading.Lock()
+        
+        # Repeated questions reuse their query embedding instead of another API call
+        self._query_vector = lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(self._query_vector)
+        
         # Initialize ChromaDB
         self._initialize_vector_store()
     
@@ -35,11 +132,20 @@ class KnowledgeBase:
             # Create persist directory if it doesn't exist
             os.makedirs(self.persist_directory, exist_ok=True)
             
-            # Initialize Chroma vector store
-            self.vector_store = Chroma(
-                collection_name=self.collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=self.persist_directory
+            # The store may have been replaced (restore), so reopen the direct connection on next use
+            with self._metadata_db_lock:
+                if self._metadata_db is not None:
+                    self._metadata_db.close()
+                    self._metadata_db = None
+            
+            # Initialize the Chroma collection; embeddings are always supplied by this class
+            self.chroma_client = chromadb.PersistentClient(
+                path=self.persist_directory,
+                settings=Settings(anonymized_telemetry=False)
+            )
+            self.collection = self.chroma_client.get_or_create_collection(
+                name=self.collection_name,
+                embedding_function=None
             )
             
             logger.info(f"Vector store initialized at {self.persist_directory}")
@@ -48,7 +154,65 @@ class KnowledgeBase:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
     
-    def add_documents(self, documents: List[Document], batch_size: int = 100):
+    @staticmethod
+    def _document_id(doc: Document) -> str:
+        """Stable id for a chunk, derived from its content and metadata"""
+        payload = orjson.dumps([doc.page_content, doc.metadata], default=str, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(payload).hexdigest()
+    
+    async def _embed_all(self, texts: List[str]) -> np.ndarray:
+        """Embed texts with concurrent embeddings requests, preserving order"""
+        client = AsyncOpenAI(api_key=config.openai_api_key)
+        semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+        
+        async def embed(chunk: List[str]) -> np.ndarray:
+            async with semaphore:
+                response = await client.embeddings.create(
+                    model=config.embedding_model, input=chunk, encoding_format="base64"
+                )
+            return _decode_embeddings(response)
+        
+        try:
+            results = await asyncio.gather(*(
+                embed(texts[i:i + EMBEDDING_REQUEST_SIZE])
+                for i in range(0, len(texts), EMBEDDING_REQUEST_SIZE)
+            ))
+        finally:
+            await client.close()
+        
+        return np.concatenate(results)
+    
+    def _embed_cached(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, only requesting embeddings for texts not already in the cache"""
+        prefix = f"{config.embedding_model}\0".encode('utf-8')
+        hashes = [hashlib.sha256(prefix + text.encode('utf-8')).digest() for text in texts]
+        
+        vectors = {}
+        with self._embedding_cache_lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), EMBEDDING_CACHE_LOOKUP_SIZE):
+                lookup = unique_hashes[i:i + EMBEDDING_CACHE_LOOKUP_SIZE]
+                placeholders = ",".join("?" * len(lookup))
+                for h, v in self._embedding_cache.execute(f"SELECT h, v FROM cache_f16 WHERE h IN ({placeholders})", lookup):
+                    vectors[h] = np.frombuffer(v, dtype=np.float16)
+        
+        misses = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+        if misses:
+            embeddings = asyncio.run(self._embed_all(list(misses.values())))
+            rows = []
+            for h, embedding in zip(misses, embeddings):
+                # Misses are indexed with the same float16-rounded vector a later cache hit returns
+                vectors[h] = embedding.astype(np.float16)
+                rows.append((h, vectors[h].tobytes()))
+            
+            with self._embedding_cache_lock:
+                self._embedding_cache.executemany("INSERT OR IGNORE INTO cache_f16 (h, v) VALUES (?, ?)", rows)
+                self._embedding_cache.commit()
+        
+        logger.info(f"Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+        return np.stack([vectors[h] for h in hashes]).astype(np.float32, copy=False)
+    
+    def add_documents(self, documents: List[Document], batch_size: int = EMBEDDING_REQUEST_SIZE * EMBEDDING_CONCURRENCY):
         """Add documents to the knowledge base"""
         if not documents:
             logger.warning("No documents to add to knowledge base")
@@ -56,37 +220,94 @@ class KnowledgeBase:
         
         logger.info(f"Adding {len(documents)} documents to knowledge base")
         
+        # One timestamp for the whole call
+        added_at = datetime.now().isoformat()
+        
         # Process documents in batches to avoid memory issues
         for i in range(0, len(documents), batch_size):
             batch = documents[i:i + batch_size]
             
             try:
-                # Add timestamp to metadata
-                for doc in batch:
-                    doc.metadata['added_at'] = datetime.now().isoformat()
+                # Ids are hashed before the timestamp is added, so identical chunks share one id
+                entries = {self._document_id(doc): doc for doc in batch}
+                
+                # Chunks already in the collection are skipped before any embedding work
+                existing = self.collection.get(ids=list(entries), include=[])['ids']
+                for doc_id in existing:
+                    del entries[doc_id]
+                
+                if not entries:
+                    logger.info(f"Batch {i//batch_size + 1} already present, skipped")
+                    continue
+                
+                for doc in entries.values():
+                    doc.metadata['added_at'] = added_at
                 
-                # Add documents to vector store
-                self.vector_store.add_documents(batch)
+                ids = list(entries)
+                texts = [doc.page_content for doc in entries.values()]
+                metadatas = [doc.metadata for doc in entries.values()]
                 
-                logger.info(f"Added batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1}")
+                # Cached or concurrently requested embeddings, and one Chroma write per batch
+                embeddings = self._embed_cached(texts)
+                self.collection.add(
+                    ids=ids,
+                    embeddings=embeddings.tolist(),  # Chroma 0.4 validates embeddings as lists
+                    metadatas=metadatas,
+                    documents=texts
+                )
+                
+                logger.info(f"Added batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1} ({len(existing)} existing chunks skipped)")
                 
             except Exception as e:
                 logger.error(f"Failed to add batch {i//batch_size + 1}: {e}")
                 raise
         
-        # Persist the vector store
-        self.vector_store.persist()
-        logger.info("Knowledge base updated and persisted")
+        logger.info("Knowledge base updated")
+    
+    def persist(self):
+        """Mark the end of a full ingest; the persistent Chroma client writes through to disk"""
+        logger.info(f"Knowledge base persisted at {self.persist_directory}")
+    
+    def _query_vector(self, text: str) -> np.ndarray:
+        """Embed a query string as a read-only float32 array; memoized per instance in __init__"""
+        response = self.openai_client.embeddings.create(
+            model=config.embedding_model, input=[text], encoding_format="base64"
+        )
+        vector = _decode_embeddings(response)[0]
+        vector.flags.writeable = False
+        return vector
     
-    def search_similar(self, query: str, k: int = 5, filter_dict: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
-        """Search for similar documents"""
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a query string with the knowledge base embedding model"""
+        return self._query_vector(text)
+    
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """Embed several query strings in a single embeddings request"""
+        response = self.openai_client.embeddings.create(
+            model=config.embedding_model, input=texts, encoding_format="base64"
+        )
+        return _decode_embeddings(response)
+    
+    def search_similar(self, query: str, k: int = 5, filter_dict: Optional[Dict[str, Any]] = None,
+                       query_embedding: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
+        """Search for similar documents, reusing query_embedding when the caller already has it"""
         try:
-            # Perform similarity search with scores
-            results = self.vector_store.similarity_search_with_score(
-                query,
-                k=k,
-                filter=filter_dict
+            if query_embedding is None:
+                query_embedding = self._query_vector(query)
+            
+            # Perform similarity search with scores (distances) against the query embedding
+            response = self.collection.query(
+                query_embeddings=[np.asarray(query_embedding, dtype=np.float32).tolist()],
+                n_results=k,
+                where=filter_dict,
+                include=['documents', 'metadatas', 'distances']
             )
+            results = [
+                (Document(page_content=text, metadata=metadata or {}), distance)
+                for text, metadata, distance in zip(
+                    response['documents'][0], response['metadatas'][0], response['distances'][0]
+                )
+            ]
             
             logger.info(f"Found {len(results)} similar documents for query: {query[:50]}...")
             return results
@@ -95,50 +316,56 @@ class KnowledgeBase:
             logger.error(f"Search failed: {e}")
             return []
     
-    def search_by_document_type(self, query: str, document_type: str, k: int = 5) -> List[Tuple[Document, float]]:
+    def search_by_document_type(self, query: str, document_type: str, k: int = 5,
+                                query_embedding: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
         """Search within a specific document type"""
         filter_dict = {"document_type": document_type}
-        return self.search_similar(query, k, filter_dict)
+        return self.search_similar(query, k, filter_dict, query_embedding=query_embedding)
     
-    def search_faqs(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+    def search_faqs(self, query: str, k: int = 5, query_embedding: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
         """Search specifically in FAQ documents"""
-        return self.search_by_document_type(query, "faq", k)
+        return self.search_by_document_type(query, "faq", k, query_embedding=query_embedding)
     
-    def search_meeting_notes(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+    def search_meeting_notes(self, query: str, k: int = 5, query_embedding: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
         """Search specifically in meeting notes"""
-        return self.search_by_document_type(query, "meeting_notes", k)
+        return self.search_by_document_type(query, "meeting_notes", k, query_embedding=query_embedding)
     
-    def get_relevant_context(self, query: str, max_chunks: int = 5, relevance_threshold: float = 0.7) -> List[Dict[str, Any]]:
+    def get_relevant_context(self, query: str, max_chunks: int = 5, relevance_threshold: float = 0.7,
+                             query_embedding: Optional[np.ndarray] = None) -> List[ContextItem]:
         """Get relevant context for a query with filtering"""
-        # First, search in FAQs (higher priority)
-        faq_results = self.search_faqs(query, max_chunks // 2 + 1)
+        if query_embedding is None:
+            query_embedding = self._query_vector(query)
         
-        # Then, search in meeting notes
-        meeting_results = self.search_meeting_notes(query, max_chunks // 2 + 1)
-        
-        # Combine and sort by relevance
-        all_results = faq_results + meeting_results
-        all_results.sort(key=lambda x: x[1])  # Sort by score (lower is better)
+        # Search FAQs and meeting notes with one embedding and one index traversal
+        all_results = self.search_similar(
+            query,
+            k=max_chunks,
+            filter_dict={"document_type": {"$in": ["faq", "meeting_notes"]}},
+            query_embedding=query_embedding
+        )
         
-        # Filter by relevance threshold and format results
+        # Results of a single search are already in ascending distance order
+        # (lower is better), so the threshold cut is a prefix and no sort is needed
         relevant_context = []
-        for doc, score in all_results[:max_chunks]:
-            if score <= relevance_threshold:
-                context_item = {
-                    'content': doc.page_content,
-                    'metadata': doc.metadata,
-                    'relevance_score': score,
-                    'document_type': doc.metadata.get('document_type'),
-                    'document_title': doc.metadata.get('document_title'),
-                    'section_type': doc.metadata.get('section_type')
-                }
-                
-                # Add FAQ-specific information
-                if doc.metadata.get('section_type') == 'faq':
-                    context_item['question'] = doc.metadata.get('question')
-                    context_item['answer'] = doc.metadata.get('answer')
-                
-                relevant_context.append(context_item)
+        for doc, score in all_results:
+            if score > relevance_threshold:
+                break
+            
+            context_item = ContextItem(
+                content=doc.page_content,
+                metadata=doc.metadata,
+                relevance_score=score,
+                document_type=doc.metadata.get('document_type'),
+                document_title=doc.metadata.get('document_title'),
+                section_type=doc.metadata.get('section_type')
+            )
+            
+            # Add FAQ-specific information
+            if context_item.section_type == 'faq':
+                context_item.question = doc.metadata.get('question')
+                context_item.answer = doc.metadata.get('answer')
+            
+            relevant_context.append(context_item)
         
         logger.info(f"Retrieved {len(relevant_context)} relevant context items")
         return relevant_context
@@ -147,24 +374,18 @@ class KnowledgeBase:
         """Get statistics about the knowledge base"""
         try:
             # Get collection info
-            collection = self.vector_store._collection
+            collection = self.collection
             count = collection.count()
             
-            # Get all documents to analyze metadata
-            all_docs = self.vector_store.get()
-            
-            # Analyze document types
-            doc_types = {}
-            section_types = {}
-            
-            if all_docs and 'metadatas' in all_docs:
-                for metadata in all_docs['metadatas']:
-                    if metadata:
-                        doc_type = metadata.get('document_type', 'unknown')
-                        section_type = metadata.get('section_type', 'unknown')
-                        
-                        doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
-                        section_types[section_type] = section_types.get(section_type, 0) + 1
+            database_path = os.path.join(self.persist_directory, 'chroma.sqlite3')
+            if os.path.exists(database_path):
+                doc_types, section_types = self._count_metadata_sql(database_path, str(collection.id), count)
+            else:
+                # Without the SQLite file, count the loaded metadata
+                all_docs = self.collection.get(include=['metadatas'])
+                metadatas = [metadata for metadata in all_docs.get('metadatas') or [] if metadata]
+                doc_types = dict(Counter(metadata.get('document_type', 'unknown') for metadata in metadatas))
+                section_types = dict(Counter(metadata.get('section_type', 'unknown') for metadata in metadatas))
             
             return {
                 'total_documents': count,
@@ -178,11 +399,30 @@ class KnowledgeBase:
             logger.error(f"Failed to get collection stats: {e}")
             return {}
     
+    @staticmethod
+    def _count_metadata_sql(database_path: str, collection_id: str, count: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Count metadata values in Chroma's SQLite store instead of loading every document"""
+        counts = {'document_type': {}, 'section_type': {}}
+        connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+        try:
+            for key, value, value_count in connection.execute(METADATA_COUNTS_SQL, (collection_id,)):
+                counts[key][value] = value_count
+        finally:
+            connection.close()
+        
+        # Chunks without a value are reported as unknown
+        for types in counts.values():
+            missing = count - sum(types.values())
+            if missing > 0:
+                types['unknown'] = types.get('unknown', 0) + missing
+        
+        return counts['document_type'], counts['section_type']
+    
     def clear_knowledge_base(self):
         """Clear all documents from the knowledge base"""
         try:
             # Delete the collection
-            self.vector_store.delete_collection()
+            self.chroma_client.delete_collection(self.collection_name)
             
             # Reinitialize
             self._initialize_vector_store()
@@ -208,9 +448,10 @@ class KnowledgeBase:
     def search_by_metadata(self, metadata_filter: Dict[str, Any], k: int = 10) -> List[Document]:
         """Search documents by metadata criteria"""
         try:
-            results = self.vector_store.get(
+            results = self.collection.get(
                 where=metadata_filter,
-                limit=k
+                limit=k,
+                include=['documents', 'metadatas']
             )
             
             documents = []
@@ -230,13 +471,46 @@ class KnowledgeBase:
     
     def get_document_by_id(self, document_id: str) -> List[Document]:
         """Get all chunks for a specific document"""
-        return self.search_by_metadata({"document_id": document_id})
+        database_path = os.path.join(self.persist_directory, 'chroma.sqlite3')
+        if not os.path.exists(database_path):
+            return self.search_by_metadata({"document_id": document_id})
+        
+        try:
+            with self._metadata_db_lock:
+                # Read-only: Chroma owns this schema and its migrations, so no DDL or writes here
+                if self._metadata_db is None:
+                    self._metadata_db = sqlite3.connect(
+                        f"file:{database_path}?mode=ro", uri=True, check_same_thread=False
+                    )
+                
+                collection_id = str(self.collection.id)
+                rows = self._metadata_db.execute(DOCUMENT_CHUNKS_SQL, (collection_id, document_id)).fetchall()
+            
+            # Rows arrive grouped by chunk; rebuild each chunk's metadata and text
+            chunks = {}
+            for chunk_id, key, string_value, int_value, float_value, bool_value in rows:
+                chunk = chunks.setdefault(chunk_id, {'text': '', 'metadata': {}})
+                if key == CHROMA_DOCUMENT_KEY:
+                    chunk['text'] = string_value
+                elif string_value is not None:
+                    chunk['metadata'][key] = string_value
+                elif int_value is not None:
+                    chunk['metadata'][key] = int_value
+                elif float_value is not None:
+                    chunk['metadata'][key] = float_value
+                elif bool_value is not None:
+                    chunk['metadata'][key] = bool(bool_value)
+            
+            return [Document(page_content=chunk['text'], metadata=chunk['metadata']) for chunk in chunks.values()]
+            
+        except Exception as e:
+            logger.error(f"Document lookup failed: {e}")
+            return []
     
     def backup_knowledge_base(self, backup_path: str):
         """Create a backup of the knowledge base"""
         try:
-            import shutil
-            shutil.copytree(self.persist_directory, backup_path)
+            shutil.copytree(self.persist_directory, backup_path, copy_function=_copy_file)
             logger.info(f"Knowledge base backed up to {backup_path}")
         except Exception as e:
             logger.error(f"Backup failed: {e}")
@@ -245,10 +519,9 @@ class KnowledgeBase:
     def restore_knowledge_base(self, backup_path: str):
         """Restore knowledge base from backup"""
         try:
-            import shutil
             if os.path.exists(self.persist_directory):
                 shutil.rmtree(self.persist_directory)
-            shutil.copytree(backup_path, self.persist_directory)
+            shutil.copytree(backup_path, self.persist_directory, copy_function=_copy_file)
             
             # Reinitialize vector store
             self._initialize_vector_store()
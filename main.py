@@ -8,7 +8,7 @@ import logging
 import argparse
 import sys
 from typing import List, Dict, Any
-import json
+import orjson
 from datetime import datetime
 
 from config import config
@@ -98,6 +98,7 @@ def update_knowledge_base(knowledge_base: KnowledgeBase, processed_chunks: List)
     
     try:
         knowledge_base.update_documents(processed_chunks)
+        knowledge_base.persist()
         
         # Get and display statistics
         stats = knowledge_base.get_collection_stats()
@@ -143,7 +144,7 @@ def interactive_qa_session(qa_system: QASystem):
             if question.lower().startswith('stats'):
                 stats = qa_system.knowledge_base.get_collection_stats()
                 print(f"\nKnowledge Base Statistics:")
-                print(json.dumps(stats, indent=2))
+                print(orjson.dumps(stats, option=orjson.OPT_INDENT_2).decode('utf-8'))
                 continue
             
             if question.lower().startswith('faq '):
@@ -151,12 +152,14 @@ def interactive_qa_session(qa_system: QASystem):
                 suggestions = qa_system.get_faq_suggestions(search_term, 5)
                 
                 if suggestions:
-                    print(f"\nFAQ Suggestions for '{search_term}':")
+                    # Build the listing first and write it in one call
+                    lines = [f"\nFAQ Suggestions for '{search_term}':"]
                     for i, suggestion in enumerate(suggestions, 1):
-                        print(f"{i}. Q: {suggestion['question']}")
-                        print(f"   A: {suggestion['answer'][:100]}...")
-                        print(f"   (Relevance: {suggestion['relevance_score']:.3f})")
-                        print()
+                        lines.append(f"{i}. Q: {suggestion['question']}")
+                        lines.append(f"   A: {suggestion['answer'][:100]}...")
+                        lines.append(f"   (Relevance: {suggestion['relevance_score']:.3f})")
+                        lines.append("")
+                    print("\n".join(lines))
                 else:
                     print("No FAQ suggestions found.")
                 continue
@@ -166,13 +169,14 @@ def interactive_qa_session(qa_system: QASystem):
                 topics = qa_system.search_meeting_topics(topic, 5)
                 
                 if topics:
-                    print(f"\nMeeting Topics for '{topic}':")
+                    lines = [f"\nMeeting Topics for '{topic}':"]
                     for i, topic_info in enumerate(topics, 1):
-                        print(f"{i}. {topic_info['document_title']}")
-                        print(f"   Section: {topic_info['section_title']}")
-                        print(f"   Content: {topic_info['content'][:150]}...")
-                        print(f"   (Relevance: {topic_info['relevance_score']:.3f})")
-                        print()
+                        lines.append(f"{i}. {topic_info['document_title']}")
+                        lines.append(f"   Section: {topic_info['section_title']}")
+                        lines.append(f"   Content: {topic_info['content'][:150]}...")
+                        lines.append(f"   (Relevance: {topic_info['relevance_score']:.3f})")
+                        lines.append("")
+                    print("\n".join(lines))
                 else:
                     print("No meeting topics found.")
                 continue
@@ -187,37 +191,48 @@ def interactive_qa_session(qa_system: QASystem):
                         'export_timestamp': datetime.now().isoformat()
                     }
                     
-                    with open(filename, 'w') as f:
-                        json.dump(export_data, f, indent=2)
+                    with open(filename, 'wb') as f:
+                        f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2))
                     
                     print(f"\nConversation exported to {filename}")
                 else:
                     print("No conversation history to export.")
                 continue
             
-            # Process the question
+            # Process the question, printing the answer as it streams in
             print("\nSearching knowledge base...")
-            answer_result = qa_system.answer_question(question)
-            
-            # Display the answer
             print(f"\nQuestion: {question}")
-            print(f"Answer: {answer_result['answer']}")
-            print(f"Confidence: {answer_result['confidence']:.2f}")
+            sys.stdout.write("Answer: ")
+            streamed = []
+            
+            def write_token(token: str):
+                streamed.append(token)
+                sys.stdout.write(token)
+                sys.stdout.flush()
+            
+            answer_result = qa_system.answer_question(question, on_token=write_token)
+            
+            # Answers that did not come from the LLM (no context, errors) are printed whole
+            output = [] if streamed else [answer_result['answer']]
+            output.append(f"\nConfidence: {answer_result['confidence']:.2f}\n")
             
             # Display sources
             if answer_result['sources']:
-                print("\nSources:")
+                output.append("\nSources:\n")
                 for i, source in enumerate(answer_result['sources'], 1):
                     doc_type = source['document_type']
                     doc_title = source['document_title']
                     section_type = source['section_type']
                     relevance = source['relevance_score']
                     
-                    print(f"{i}. {doc_type.upper()}: {doc_title} ({section_type.replace('_', ' ').title()})")
-                    print(f"   Relevance: {relevance:.3f}")
+                    output.append(f"{i}. {doc_type.upper()}: {doc_title} ({section_type.replace('_', ' ').title()})\n")
+                    output.append(f"   Relevance: {relevance:.3f}\n")
                     
                     if source.get('faq_question'):
-                        print(f"   FAQ: {source['faq_question']}")
+                        output.append(f"   FAQ: {source['faq_question']}\n")
+            
+            # Write the rest of the response in one call
+            sys.stdout.write("".join(output))
             
             # Add to conversation history
             conversation_history.append({
@@ -279,7 +294,7 @@ def main():
     if args.stats:
         stats = knowledge_base.get_collection_stats()
         print("\nKnowledge Base Statistics:")
-        print(json.dumps(stats, indent=2))
+        print(orjson.dumps(stats, option=orjson.OPT_INDENT_2).decode('utf-8'))
         return
     
     # Handle single question
@@ -1,27 +1,142 @@
+import asyncio
+import atexit
 import logging
-from typing import Dict, Any, List, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from langchain.cache import SQLiteCache
 from langchain.chat_models import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain.schema import HumanMessage, AIMessage
+from langchain.globals import get_llm_cache, set_llm_cache
+from langchain.schema import HumanMessage, AIMessage, SystemMessage, BaseMessage
 from datetime import datetime
 import json
 
 from config import config
-from knowledge_base import KnowledgeBase
+from knowledge_base import ContextItem, KnowledgeBase
+from semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Below this temperature completions are treated as deterministic and cached on disk
+LLM_CACHE_MAX_TEMPERATURE = 0.1
+
+# Meeting topic searches fetch this many pages of results at once and keep
+# them for later pages, bounded by entry count and age in seconds
+TOPIC_PREFETCH_PAGES = 4
+TOPIC_CACHE_SIZE = 128
+TOPIC_CACHE_TTL = 60
+
+# Compound questions ("X and Y?") answered from cached parts: at most this many
+# parts, each at least COMPOUND_MIN_SIMILARITY and on average COMPOUND_MEAN_SIMILARITY
+# to a cached question
+COMPOUND_SPLIT_PATTERN = re.compile(r'\s+and\s+|;\s*|\?\s+', re.IGNORECASE)
+COMPOUND_MAX_PARTS = 3
+COMPOUND_MIN_SIMILARITY = 0.85
+COMPOUND_MEAN_SIMILARITY = 0.95
+
+# Answers are only cached for the default context size, so a request for more
+# context never gets an answer built from less
+DEFAULT_CONTEXT_ITEMS = 5
+
+# Last formatted timestamp, refreshed at most once per second
+_iso_second = None
+_iso_value = ""
+
+# Recently formatted context blocks; identical retrievals reuse the rendered string
+CONTEXT_CACHE_SIZE = 256
+
+def iso_now() -> str:
+    """Current local time as an ISO string, formatted once per second"""
+    global _iso_second, _iso_value
+    second = int(time.time())
+    if second != _iso_second:
+        _iso_value = datetime.fromtimestamp(second).isoformat()
+        _iso_second = second
+    return _iso_value
+
+@lru_cache(maxsize=4)
+def get_llm(model_name: str, temperature: float, max_tokens: int) -> ChatOpenAI:
+    """Return a process-wide chat model so every QASystem reuses its pooled HTTP connections"""
+    return ChatOpenAI(
+        openai_api_key=config.openai_api_key,
+        model_name=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        max_retries=2
+    )
+
+HUMAN_PROMPT_TEMPLATE = """
+Context Information:
+{context}
+
+Question: {question}
+
+Please provide a comprehensive answer based on the context provided above.
+"""
+
+# The human prompt split around the context block, so the question can be
+# filled in before retrieval finishes
+HUMAN_PROMPT_HEAD, HUMAN_PROMPT_TAIL = HUMAN_PROMPT_TEMPLATE.split('{context}')
+
+CONTEXT_HEADER = "\n" + "=" * 50
+
+@lru_cache(maxsize=None)
+def section_label(section_type: str) -> str:
+    """Human-readable section name, e.g. 'action_items' -> 'Action Items'"""
+    return section_type.replace('_', ' ').title()
+
+@lru_cache(maxsize=CONTEXT_CACHE_SIZE)
+def _render_context(items: Tuple[Tuple[Any, ...], ...]) -> str:
+    """Format context item fields for the prompt"""
+    parts = [CONTEXT_HEADER]
+    
+    for i, (content, document_type, document_title, section_type, question, answer, relevance_score) in enumerate(items, 1):
+        if i > 1:
+            parts.append("\n")
+        
+        # Format based on document type
+        if section_type == 'faq':
+            parts.extend(("\nSource ", str(i), ": FAQ - ", str(document_title),
+                          "\nQuestion: ", str(question),
+                          "\nAnswer: ", str(answer)))
+        else:
+            parts.extend(("\nSource ", str(i), ": ", document_type.upper(), " - ", str(document_title),
+                          "\nSection: ", section_label(section_type),
+                          "\nContent: ", str(content)))
+        parts.append(f"\n(Relevance: {relevance_score:.3f})\n")
+    
+    return "".join(parts)
+
 class QASystem:
     """Question-answering system using the knowledge base"""
     
     def __init__(self, knowledge_base: KnowledgeBase):
         self.knowledge_base = knowledge_base
-        self.llm = ChatOpenAI(
-            openai_api_key=config.openai_api_key,
-            model_name=config.qa_model,
-            temperature=config.temperature,
-            max_tokens=config.max_tokens
+        
+        # Exact-match completion cache keyed by prompt, model and temperature; only for
+        # (near-)deterministic settings so sampled answers are not frozen
+        if config.temperature < LLM_CACHE_MAX_TEMPERATURE and get_llm_cache() is None:
+            set_llm_cache(SQLiteCache(database_path=config.llm_cache_path))
+        
+        self.llm = get_llm(config.qa_model, config.temperature, config.max_tokens)
+        
+        # Answers for semantically equivalent questions asked recently, keyed by question embedding
+        self.answer_cache = SemanticCache(
+            max_entries=config.max_cache_entries,
+            ttl=config.semantic_cache_ttl,
+            threshold=config.semantic_cache_threshold
         )
+        # Carry recent answers across restarts; entries past the TTL are dropped on load
+        self.answer_cache.load(config.answer_cache_path, decode=self._decode_cached_result)
+        atexit.register(self.answer_cache.save, config.answer_cache_path)
+        
+        # Prefetched meeting topic results for pagination, keyed by topic text:
+        # (fetched at, results, number of results requested)
+        self._topic_cache: "OrderedDict[str, Tuple[float, List[Dict[str, Any]], int]]" = OrderedDict()
+        self._topic_cache_lock = threading.Lock()
         
         # System prompt for the QA system
         self.system_prompt = """You are a knowledgeable assistant that answers questions based on leadership meeting notes and FAQs.
@@ -47,137 +162,244 @@ class QASystem:
 - End with source references in format: [Source: Document Type - Document Title]
 """
         
-        # Create the prompt template
-        self.prompt_template = ChatPromptTemplate.from_messages([
-            SystemMessagePromptTemplate.from_template(self.system_prompt),
-            HumanMessagePromptTemplate.from_template("""
-Context Information:
-{context}
-
-Question: {question}
-
-Please provide a comprehensive answer based on the context provided above.
-""")
-        ])
+        # The system message never changes, so it is built once
+        self._system_message = SystemMessage(content=self.system_prompt)
     
-    def _format_context(self, context_items: List[Dict[str, Any]]) -> str:
+    def _format_context(self, context_items: List[ContextItem]) -> str:
         """Format context items for the prompt"""
-        formatted_context = []
-        
-        for i, item in enumerate(context_items, 1):
-            content = item['content']
-            metadata = item['metadata']
-            document_type = item['document_type']
-            document_title = item['document_title']
-            section_type = item['section_type']
-            relevance_score = item['relevance_score']
-            
-            # Format based on document type
-            if section_type == 'faq' and 'question' in item:
-                formatted_item = f"""
-Source {i}: FAQ - {document_title}
-Question: {item['question']}
-Answer: {item['answer']}
-(Relevance: {relevance_score:.3f})
-"""
-            else:
-                formatted_item = f"""
-Source {i}: {document_type.upper()} - {document_title}
-Section: {section_type.replace('_', ' ').title()}
-Content: {content}
-(Relevance: {relevance_score:.3f})
-"""
-            
-            formatted_context.append(formatted_item)
-        
-        return "\n" + "="*50 + "\n".join(formatted_context)
+        return _render_context(tuple(
+            (item.content, item.document_type, item.document_title, item.section_type,
+             item.question, item.answer, round(item.relevance_score, 3))
+            for item in context_items
+        ))
     
-    def answer_question(self, question: str, max_context_items: int = 5) -> Dict[str, Any]:
-        """Answer a question using the knowledge base"""
+    def answer_question(self, question: str, max_context_items: int = DEFAULT_CONTEXT_ITEMS, query_embedding: Optional[Any] = None,
+                        on_token: Optional[Callable[[str], None]] = None,
+                        history: Optional[List[BaseMessage]] = None) -> Dict[str, Any]:
+        """Answer a question using the knowledge base, passing answer tokens to on_token as they stream in
+        
+        history holds earlier conversation turns as chat messages; answers that
+        depend on it bypass the semantic answer cache.
+        """
         try:
+            # Serve semantically equivalent questions from the cache
+            if query_embedding is None:
+                query_embedding = self.knowledge_base.embed_query(question)
+            use_cache = not history and max_context_items == DEFAULT_CONTEXT_ITEMS
+            if use_cache:
+                cached_result = self.get_cached_answer(question, query_embedding)
+                if cached_result is not None:
+                    return cached_result
+            
             # Get relevant context from knowledge base
             context_items = self.knowledge_base.get_relevant_context(
                 question, 
-                max_chunks=max_context_items
+                max_chunks=max_context_items,
+                query_embedding=query_embedding
             )
             
             if not context_items:
-                return {
-                    'answer': "I don't have enough information in my knowledge base to answer this question. Please check if the relevant documents have been added to the system.",
-                    'sources': [],
-                    'context_used': [],
-                    'confidence': 0.0,
-                    'question': question,
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            # Format context for the prompt
-            formatted_context = self._format_context(context_items)
+                return self._no_context_result(question)
             
-            # Generate the prompt
-            prompt = self.prompt_template.format_messages(
-                context=formatted_context,
-                question=question
-            )
+            prompt = self._build_prompt(question, context_items, history)
             
             # Get response from the LLM
-            response = self.llm(prompt)
-            answer = response.content
+            if on_token is None:
+                answer = self.llm(prompt).content
+            else:
+                parts = []
+                for chunk in self.llm.stream(prompt):
+                    on_token(chunk.content)
+                    parts.append(chunk.content)
+                answer = "".join(parts)
             
-            # Extract source information
-            sources = []
-            for item in context_items:
-                source_info = {
-                    'document_type': item['document_type'],
-                    'document_title': item['document_title'],
-                    'section_type': item['section_type'],
-                    'relevance_score': item['relevance_score']
-                }
-                
-                if item['section_type'] == 'faq' and 'question' in item:
-                    source_info['faq_question'] = item['question']
-                
-                sources.append(source_info)
+            result = self._build_result(question, context_items, answer)
+            if use_cache:
+                self.answer_cache.put(query_embedding, result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error answering question: {e}")
+            return self._error_result(question, e)
+    
+    def get_cached_answer(self, question: str, query_embedding: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached answer to a semantically equivalent question, re-labelled for this question
+        
+        The stored result belongs to whoever asked first, so the copy carries
+        the current question wording and timestamp.
+        """
+        if query_embedding is None:
+            query_embedding = self.knowledge_base.embed_query(question)
+        cached_result = self.answer_cache.get(query_embedding)
+        if cached_result is None:
+            return None
+        return {**cached_result, 'question': question, 'timestamp': iso_now()}
+    
+    def compose_cached_answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """Answer a compound question from cached answers to each of its parts, or None
+        
+        Only worth calling after the question itself missed the caches; it costs
+        one embeddings request and never calls the LLM.
+        """
+        parts = [part.strip(' ?.') for part in COMPOUND_SPLIT_PATTERN.split(question)]
+        parts = [part for part in parts if part]
+        if not 2 <= len(parts) <= COMPOUND_MAX_PARTS:
+            return None
+        
+        try:
+            embeddings = self.knowledge_base.embed_queries(parts)
+            
+            results = []
+            total_similarity = 0.0
+            for embedding in embeddings:
+                result, similarity = self.answer_cache.lookup(embedding, threshold=COMPOUND_MIN_SIMILARITY)
+                if result is None:
+                    return None
+                results.append(result)
+                total_similarity += similarity
             
-            # Calculate confidence based on relevance scores
-            avg_relevance = sum(item['relevance_score'] for item in context_items) / len(context_items)
-            confidence = max(0.0, 1.0 - avg_relevance)  # Convert distance to confidence
+            if total_similarity < COMPOUND_MEAN_SIMILARITY * len(parts):
+                return None
             
+            logger.info(f"Answered compound question from {len(parts)} cached answers")
             return {
-                'answer': answer,
-                'sources': sources,
-                'context_used': context_items,
-                'confidence': confidence,
+                'answer': "\n\n".join(result['answer'] for result in results),
+                'sources': [source for result in results for source in result['sources']],
+                'context_used': [item for result in results for item in result['context_used']],
+                'confidence': min(result['confidence'] for result in results),
                 'question': question,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }
             
         except Exception as e:
-            logger.error(f"Error answering question: {e}")
-            return {
-                'answer': f"I encountered an error while processing your question: {str(e)}",
-                'sources': [],
-                'context_used': [],
-                'confidence': 0.0,
-                'question': question,
-                'timestamp': datetime.now().isoformat()
+            logger.error(f"Error composing cached answer: {e}")
+            return None
+    
+    async def _aanswer(self, question: str, semaphore: asyncio.Semaphore, max_context_items: int = DEFAULT_CONTEXT_ITEMS) -> Dict[str, Any]:
+        """Answer a question without blocking the event loop on retrieval or the LLM call"""
+        async with semaphore:
+            try:
+                query_embedding = await asyncio.to_thread(self.knowledge_base.embed_query, question)
+                use_cache = max_context_items == DEFAULT_CONTEXT_ITEMS
+                if use_cache:
+                    cached_result = self.get_cached_answer(question, query_embedding)
+                    if cached_result is not None:
+                        return cached_result
+                
+                # Compose the question side of the prompt while retrieval runs
+                context_task = asyncio.create_task(asyncio.to_thread(
+                    self.knowledge_base.get_relevant_context, question,
+                    max_chunks=max_context_items, query_embedding=query_embedding
+                ))
+                prompt_tail = self._prompt_tail(question)
+                context_items = await context_task
+                
+                if not context_items:
+                    return self._no_context_result(question)
+                
+                response = await self.llm.ainvoke(self._build_prompt(question, context_items, prompt_tail=prompt_tail))
+                result = self._build_result(question, context_items, response.content)
+                if use_cache:
+                    self.answer_cache.put(query_embedding, result)
+                return result
+                
+            except Exception as e:
+                logger.error(f"Error answering question: {e}")
+                return self._error_result(question, e)
+    
+    @staticmethod
+    def _prompt_tail(question: str) -> str:
+        """Render the part of the human prompt that follows the context block"""
+        return HUMAN_PROMPT_TAIL.format(question=question)
+    
+    def _build_prompt(self, question: str, context_items: List[ContextItem],
+                      history: Optional[List[BaseMessage]] = None,
+                      prompt_tail: Optional[str] = None) -> List[BaseMessage]:
+        """Render the chat messages for a question, its context and any earlier turns"""
+        if prompt_tail is None:
+            prompt_tail = self._prompt_tail(question)
+        return [
+            self._system_message,
+            *(history or ()),
+            HumanMessage(content=HUMAN_PROMPT_HEAD + self._format_context(context_items) + prompt_tail)
+        ]
+    
+    def _build_result(self, question: str, context_items: List[ContextItem], answer: str) -> Dict[str, Any]:
+        """Assemble the answer result with sources and confidence"""
+        # Extract source information, summing relevance in the same pass
+        sources = []
+        total_relevance = 0.0
+        for item in context_items:
+            total_relevance += item.relevance_score
+            source_info = {
+                'document_type': item.document_type,
+                'document_title': item.document_title,
+                'section_type': item.section_type,
+                'relevance_score': item.relevance_score
             }
+            
+            if item.section_type == 'faq':
+                source_info['faq_question'] = item.question
+            
+            sources.append(source_info)
+        
+        # Calculate confidence based on relevance scores
+        avg_relevance = total_relevance / len(context_items)
+        confidence = max(0.0, 1.0 - avg_relevance)  # Convert distance to confidence
+        
+        return {
+            'answer': answer,
+            'sources': sources,
+            'context_used': context_items,
+            'confidence': confidence,
+            'question': question,
+            'timestamp': iso_now()
+        }
+    
+    @staticmethod
+    def _decode_cached_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild the context items of an answer result restored from disk"""
+        result['context_used'] = [ContextItem(**item) for item in result.get('context_used', [])]
+        return result
+    
+    @staticmethod
+    def _no_context_result(question: str) -> Dict[str, Any]:
+        """Result returned when the knowledge base has nothing relevant"""
+        return {
+            'answer': "I don't have enough information in my knowledge base to answer this question. Please check if the relevant documents have been added to the system.",
+            'sources': [],
+            'context_used': [],
+            'confidence': 0.0,
+            'question': question,
+            'timestamp': iso_now()
+        }
+    
+    @staticmethod
+    def _error_result(question: str, error: Exception) -> Dict[str, Any]:
+        """Result returned when answering a question failed"""
+        return {
+            'answer': f"I encountered an error while processing your question: {str(error)}",
+            'sources': [],
+            'context_used': [],
+            'confidence': 0.0,
+            'question': question,
+            'timestamp': iso_now()
+        }
     
     def batch_answer_questions(self, questions: List[str]) -> List[Dict[str, Any]]:
-        """Answer multiple questions in batch"""
-        results = []
-        
-        for question in questions:
-            result = self.answer_question(question)
-            results.append(result)
+        """Answer multiple questions in batch, with concurrent LLM calls"""
+        async def answer_all():
+            # Bound in-flight questions to respect API rate limits
+            semaphore = asyncio.Semaphore(config.max_concurrent_requests)
+            return await asyncio.gather(*(self._aanswer(question, semaphore) for question in questions))
         
-        return results
+        return list(asyncio.run(answer_all()))
     
-    def get_faq_suggestions(self, query: str, max_suggestions: int = 3) -> List[Dict[str, Any]]:
-        """Get FAQ suggestions based on a query"""
+    def get_faq_suggestions(self, query: str, max_suggestions: int = 3, query_embedding: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """Get FAQ suggestions based on a query, reusing query_embedding when the caller has one"""
         try:
             # Search specifically in FAQs
-            faq_results = self.knowledge_base.search_faqs(query, max_suggestions)
+            faq_results = self.knowledge_base.search_faqs(query, max_suggestions, query_embedding=query_embedding)
             
             suggestions = []
             for doc, score in faq_results:
@@ -199,11 +421,32 @@ Content: {content}
             logger.error(f"Error getting FAQ suggestions: {e}")
             return []
     
-    def search_meeting_topics(self, topic: str, max_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for specific topics in meeting notes"""
+    def clear_caches(self):
+        """Drop cached answers and meeting topic results, e.g. after the knowledge base changes"""
+        self.answer_cache.clear()
+        with self._topic_cache_lock:
+            self._topic_cache.clear()
+    
+    def search_meeting_topics(self, topic: str, max_results: int = 5, query_embedding: Optional[Any] = None,
+                              offset: int = 0) -> List[Dict[str, Any]]:
+        """Search for specific topics in meeting notes, reusing query_embedding when the caller has one
+        
+        Results are fetched several pages at a time and cached briefly, so
+        paging through a topic with offset reuses the first search.
+        """
         try:
+            now = time.monotonic()
+            with self._topic_cache_lock:
+                cached = self._topic_cache.get(topic)
+                if cached is not None and now - cached[0] <= TOPIC_CACHE_TTL:
+                    self._topic_cache.move_to_end(topic)
+                    topics = cached[1]
+                    if offset + max_results <= len(topics) or len(topics) < cached[2]:
+                        return topics[offset:offset + max_results]
+            
             # Search in meeting notes
-            meeting_results = self.knowledge_base.search_meeting_notes(topic, max_results)
+            fetch_count = max(max_results * TOPIC_PREFETCH_PAGES, offset + max_results)
+            meeting_results = self.knowledge_base.search_meeting_notes(topic, fetch_count, query_embedding=query_embedding)
             
             topics = []
             for doc, score in meeting_results:
@@ -215,7 +458,13 @@ Content: {content}
                     'document_id': doc.metadata.get('document_id')
                 })
             
-            return topics
+            with self._topic_cache_lock:
+                self._topic_cache[topic] = (now, topics, fetch_count)
+                self._topic_cache.move_to_end(topic)
+                while len(self._topic_cache) > TOPIC_CACHE_SIZE:
+                    self._topic_cache.popitem(last=False)
+            
+            return topics[offset:offset + max_results]
             
         except Exception as e:
             logger.error(f"Error searching meeting topics: {e}")
@@ -223,24 +472,14 @@ Content: {content}
     
     def get_conversation_context(self, question: str, conversation_history: List[Dict[str, str]]) -> Dict[str, Any]:
         """Get context for a question considering conversation history"""
-        # Extract previous questions and answers for context
-        recent_context = []
+        # Previous questions and answers become chat turns; retrieval uses only the current question
+        history = []
         for item in conversation_history[-3:]:  # Use last 3 exchanges
             if item.get('question') and item.get('answer'):
-                recent_context.append(f"Q: {item['question']}\nA: {item['answer']}")
-        
-        # Modify the question to include conversational context
-        if recent_context:
-            contextual_question = f"""
-Previous conversation:
-{chr(10).join(recent_context)}
-
-Current question: {question}
-"""
-        else:
-            contextual_question = question
+                history.append(HumanMessage(content=item['question']))
+                history.append(AIMessage(content=item['answer']))
         
-        return self.answer_question(contextual_question)
+        return self.answer_question(question, history=history)
     
     def explain_answer(self, question: str, answer_result: Dict[str, Any]) -> str:
         """Provide an explanation of how the answer was generated"""
@@ -286,7 +525,7 @@ Current question: {question}
             'has_sources': len(sources) > 0,
             'confidence_score': confidence,
             'answer_length': len(answer),
-            'source_diversity': len(set(source['document_type'] for source in sources)),
+            'source_diversity': len({source['document_type'] for source in sources}),
             'high_confidence': confidence > 0.7,
             'sufficient_context': len(sources) >= 2
         }
@@ -7,6 +7,7 @@ This script runs the Leadership Knowledge Base Agent in Slack
 import os
 import sys
 import logging
+import importlib.util
 import argparse
 from datetime import datetime
 import signal
@@ -16,7 +17,6 @@ import time
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import config
-from slack_bot import SlackKnowledgeBot
 
 # Configure logging
 logging.basicConfig(
@@ -58,18 +58,15 @@ def check_dependencies():
     """Check if all required dependencies are installed"""
     logger.info("Checking dependencies...")
     
-    try:
-        import slack_bolt
-        import slack_sdk
-        import openai
-        import chromadb
-        import langchain
-        logger.info("All dependencies are available")
-        return True
-    except ImportError as e:
-        logger.error(f"Missing dependency: {e}")
-        logger.error("Please run: pip install -r requirements.txt")
-        return False
+    # Only resolve the modules; importing them here would pay their startup cost
+    for name in ("slack_bolt", "slack_sdk", "openai", "chromadb", "langchain"):
+        if importlib.util.find_spec(name) is None:
+            logger.error(f"Missing dependency: {name}")
+            logger.error("Please run: pip install -r requirements.txt")
+            return False
+    
+    logger.info("All dependencies are available")
+    return True
 
 def setup_signal_handlers(bot):
     """Set up signal handlers for graceful shutdown"""
@@ -108,6 +105,8 @@ def main():
     # Initialize the bot
     try:
         logger.info("Initializing Slack bot...")
+        # Imported here so --validate-only and missing dependencies fail fast
+        from slack_bot import SlackKnowledgeBot
         bot = SlackKnowledgeBot()
         
         # Set up signal handlers
@@ -0,0 +1,188 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """In-memory cache keyed by embedding similarity instead of exact text"""
+    
+    def __init__(self, max_entries: int = 1000, ttl: float = 300, threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        
+        # Unit-normalized question embeddings stored as int8 codes with a
+        # per-row scale (row ~= codes * scale), one row per entry
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._values: List[Any] = []
+        self._created_at: List[float] = []
+        self._last_used: List[float] = []
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._values)
+    
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    @staticmethod
+    def _quantize(vector: np.ndarray):
+        """Symmetric int8 quantization of a vector with a single scale"""
+        peak = float(np.max(np.abs(vector)))
+        scale = peak / 127 if peak > 0 else 1.0
+        return np.round(vector / scale).astype(np.int8), scale
+    
+    def get(self, embedding: Sequence[float]) -> Optional[Any]:
+        """Return the cached value for the most similar embedding, if close enough"""
+        return self.lookup(embedding)[0]
+    
+    def lookup(self, embedding: Sequence[float], threshold: Optional[float] = None) -> Tuple[Optional[Any], float]:
+        """Return the most similar unexpired value and its similarity, or (None, similarity) below threshold"""
+        query = self._normalize(embedding)
+        threshold = self.threshold if threshold is None else threshold
+        
+        with self._lock:
+            if not self._values or self._codes.shape[1] != query.shape[0]:
+                return None, 0.0
+            
+            count = len(self._values)
+            similarities = (self._codes[:count] @ query) * self._scales[:count]
+            best = int(similarities.argmax())
+            similarity = float(similarities[best])
+            
+            if similarity < threshold:
+                return None, similarity
+            
+            now = time.monotonic()
+            if now - self._created_at[best] > self.ttl:
+                return None, similarity
+            
+            self._last_used[best] = now
+            logger.info(f"Semantic cache hit (similarity {similarity:.3f})")
+            return self._values[best], similarity
+    
+    def put(self, embedding: Sequence[float], value: Any):
+        """Store a value under an embedding, evicting the least recently used entry when full"""
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        
+        with self._lock:
+            if self._codes is None or self._codes.shape[1] != vector.shape[0]:
+                # First entry, or the embedding model changed since entries were stored
+                self._reset()
+                self._codes = np.empty((self.max_entries, vector.shape[0]), dtype=np.int8)
+                self._scales = np.empty(self.max_entries, dtype=np.float32)
+            
+            if len(self._values) < self.max_entries:
+                slot = len(self._values)
+                self._values.append(value)
+                self._created_at.append(now)
+                self._last_used.append(now)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._values[slot] = value
+                self._created_at[slot] = now
+                self._last_used[slot] = now
+            
+            self._codes[slot], self._scales[slot] = self._quantize(vector)
+    
+    def _reset(self):
+        """Drop all entries; caller holds the lock"""
+        self._codes = None
+        self._scales = None
+        self._values = []
+        self._created_at = []
+        self._last_used = []
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._reset()
+    
+    def save(self, path: str):
+        """Write all entries to an .npz file so a restarted process starts warm
+        
+        Values are stored as JSON, so they must be orjson-serializable.
+        """
+        try:
+            with self._lock:
+                count = len(self._values)
+                if not count:
+                    return
+                
+                # Entry times are monotonic, which does not survive a restart; store wall-clock times
+                offset = time.time() - time.monotonic()
+                arrays = {
+                    'codes': self._codes[:count].copy(),
+                    'scales': self._scales[:count].copy(),
+                    'created_at': np.asarray(self._created_at) + offset,
+                    'last_used': np.asarray(self._last_used) + offset,
+                    'values': np.frombuffer(
+                        orjson.dumps(self._values, option=orjson.OPT_SERIALIZE_NUMPY), dtype=np.uint8
+                    )
+                }
+            
+            # A unique temp file per save, so processes sharing the path never replace it with a partial write
+            temp_file = tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path), suffix='.tmp', delete=False
+            )
+            try:
+                with temp_file:
+                    np.savez(temp_file, **arrays)
+                os.replace(temp_file.name, path)
+            except Exception:
+                os.unlink(temp_file.name)
+                raise
+            logger.info(f"Saved {count} semantic cache entries to {path}")
+            
+        except Exception as e:
+            logger.error(f"Error saving semantic cache: {e}")
+    
+    def load(self, path: str, decode: Optional[Callable[[Any], Any]] = None):
+        """Restore unexpired entries written by save, passing each value through decode"""
+        if not os.path.exists(path):
+            return
+        
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                codes = data['codes']
+                scales = data['scales']
+                offset = time.monotonic() - time.time()
+                created_at = data['created_at'] + offset
+                last_used = data['last_used'] + offset
+                values = orjson.loads(data['values'].tobytes())
+            
+            # Keep the most recently used unexpired entries that fit
+            now = time.monotonic()
+            keep = np.flatnonzero(now - created_at <= self.ttl)
+            keep = keep[np.argsort(last_used[keep])[::-1][:self.max_entries]]
+            
+            with self._lock:
+                self._reset()
+                if not len(keep):
+                    return
+                
+                self._codes = np.empty((self.max_entries, codes.shape[1]), dtype=np.int8)
+                self._scales = np.empty(self.max_entries, dtype=np.float32)
+                self._codes[:len(keep)] = codes[keep]
+                self._scales[:len(keep)] = scales[keep]
+                self._values = [decode(values[i]) if decode else values[i] for i in keep]
+                self._created_at = created_at[keep].tolist()
+                self._last_used = last_used[keep].tolist()
+            
+            logger.info(f"Loaded {len(keep)} semantic cache entries from {path}")
+            
+        except Exception as e:
+            logger.error(f"Error loading semantic cache: {e}")
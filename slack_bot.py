@@ -6,22 +6,45 @@ from datetime import datetime
 import re
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
-from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
 from config import config
 from google_docs_client import GoogleDocsClient
 from document_processor import DocumentProcessor
 from knowledge_base import KnowledgeBase
-from qa_system import QASystem
+from qa_system import QASystem, section_label
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between chat_update calls while an answer streams in (Slack rate limits updates)
+STREAM_UPDATE_SECONDS = 1.0
+
+# Questions answered concurrently, off Bolt's listener threads
+QA_WORKERS = 8
+
+# Answers kept for repeated questions, keyed by normalized question text
+EXACT_CACHE_SIZE = 512
+TRAILING_PUNCTUATION = '?!.,;: '
+
+# Chunks written to the knowledge base per add_documents call while loading
+LOAD_BATCH_SIZE = 256
+
+# Seconds /kb-stats reuses collection statistics before recounting
+STATS_CACHE_SECONDS = 30
+
+# Slack reply layout; confidence emoji indexed by how many of the 0.6/0.8 thresholds are exceeded
+ANSWER_TEMPLATE = "**Question:** {question}\n\n**Answer:** {answer}\n\n**Confidence:** {emoji} {confidence:.2f}\n\n"
+SOURCE_TEMPLATE = "{index}. {doc_type}: {doc_title} ({section})\n"
+CONFIDENCE_EMOJI = ("🔴", "🟡", "🟢")
+MAX_LISTED_SOURCES = 3
+
 class SlackKnowledgeBot:
     """Slack bot for the Leadership Knowledge Base Agent"""
     
@@ -40,8 +63,19 @@ class SlackKnowledgeBot:
         
         # Bot settings
         self.bot_user_id = None
+        self.bot_mention_literal = None
         self.bot_mention_pattern = None
         
+        # Answer results for repeated questions; Bolt runs handlers on a thread pool
+        self._exact_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._exact_cache_lock = threading.Lock()
+        
+        # Last collection statistics: (monotonic time computed, time shown to users, stats)
+        self._stats_cache = (0.0, "", None)
+        
+        # Long-running QA work so Bolt's listener threads stay free for new events
+        self._executor = ThreadPoolExecutor(max_workers=QA_WORKERS, thread_name_prefix='kb-qa')
+        
         # Initialize the system
         self._initialize_system()
         
@@ -72,10 +106,11 @@ class SlackKnowledgeBot:
     def _get_bot_info(self):
         """Get bot information for mention detection"""
         try:
-            client = WebClient(token=config.slack_bot_token)
-            response = client.auth_test()
+            response = self.app.client.auth_test()
             self.bot_user_id = response['user_id']
-            self.bot_mention_pattern = re.compile(f'<@{self.bot_user_id}>')
+            self.bot_mention_literal = f'<@{self.bot_user_id}>'
+            # Also matches labelled mentions such as <@U123|bot>
+            self.bot_mention_pattern = re.compile(f'<@{self.bot_user_id}(?:\\|[^>]*)?>')
             logger.info(f"Bot user ID: {self.bot_user_id}")
             
         except SlackApiError as e:
@@ -124,7 +159,11 @@ class SlackKnowledgeBot:
             
             # Remove bot mention if present
             if self.bot_mention_pattern and is_mention:
-                text = self.bot_mention_pattern.sub("", text).strip()
+                # Plain mentions are a literal replace; labelled variants need the regex
+                text = text.replace(self.bot_mention_literal, "")
+                if f'<@{self.bot_user_id}' in text:
+                    text = self.bot_mention_pattern.sub("", text)
+                text = text.strip()
             
             if not text:
                 say("Hi! I'm the Leadership Knowledge Base Agent. Ask me any question about our FAQs or meeting notes!")
@@ -135,24 +174,8 @@ class SlackKnowledgeBot:
                 say("⚠️ The knowledge base system is not initialized. Please contact your administrator.")
                 return
             
-            # Send typing indicator
-            try:
-                client.chat_postMessage(
-                    channel=channel_id,
-                    text="🤔 Searching knowledge base...",
-                    thread_ts=event.get("ts")
-                )
-            except:
-                pass
-            
-            # Process the question
-            answer_result = self.qa_system.answer_question(text)
-            
-            # Format the response
-            response = self._format_answer_response(answer_result)
-            
-            # Send the response
-            say(response)
+            # Process the question in the QA pool, streaming the answer into a placeholder message
+            self._executor.submit(self._answer_in_worker, client, channel_id, text)
             
         except Exception as e:
             logger.error(f"Error handling question: {e}")
@@ -180,17 +203,8 @@ class SlackKnowledgeBot:
                 )
                 return
             
-            # Process the question
-            answer_result = self.qa_system.answer_question(question)
-            
-            # Format the response
-            response = self._format_answer_response(answer_result)
-            
-            # Send the response
-            client.chat_postMessage(
-                channel=channel_id,
-                text=response
-            )
+            # Process the question in the QA pool, streaming the answer into a placeholder message
+            self._executor.submit(self._answer_in_worker, client, channel_id, question)
             
         except Exception as e:
             logger.error(f"Error handling slash command: {e}")
@@ -199,6 +213,80 @@ class SlackKnowledgeBot:
                 text=f"😞 Sorry, I encountered an error: {str(e)}"
             )
     
+    def _answer_in_worker(self, client, channel_id: str, question: str):
+        """Answer a question on a QA pool thread, reporting failures to the channel"""
+        try:
+            self._answer_streaming(client, channel_id, question)
+        except Exception as e:
+            logger.error(f"Error answering question: {e}")
+            try:
+                client.chat_postMessage(
+                    channel=channel_id,
+                    text=f"😞 Sorry, I encountered an error while processing your question: {str(e)}"
+                )
+            except SlackApiError as post_error:
+                logger.error(f"Failed to report error to Slack: {post_error}")
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Cache key for a question: lowercased, single-spaced, without trailing punctuation"""
+        return re.sub(r'\s+', ' ', text.lower()).strip(TRAILING_PUNCTUATION)
+    
+    def _answer_streaming(self, client, channel_id: str, question: str):
+        """Post a placeholder, stream answer tokens into it, then replace it with the formatted response"""
+        key = self._normalize(question)
+        with self._exact_cache_lock:
+            cached_result = self._exact_cache.get(key)
+            if cached_result is not None:
+                self._exact_cache.move_to_end(key)
+        if cached_result is not None:
+            # The cached result may come from a differently worded question with the same key
+            cached_result = {**cached_result, 'question': question}
+        else:
+            # On a semantic miss, a compound question may be covered by cached answers to its
+            # parts; the query embedding is memoized, so answer_question below reuses it
+            cached_result = self.qa_system.get_cached_answer(question)
+            if cached_result is None:
+                cached_result = self.qa_system.compose_cached_answer(question)
+        if cached_result is not None:
+            client.chat_postMessage(channel=channel_id, text=self._format_answer_response(cached_result))
+            return
+        
+        placeholder = client.chat_postMessage(channel=channel_id, text="🤔 Searching knowledge base...")
+        message_ts = placeholder["ts"]
+        
+        parts = []
+        last_update = time.monotonic()
+        
+        def on_token(token: str):
+            nonlocal last_update
+            parts.append(token)
+            now = time.monotonic()
+            if now - last_update >= STREAM_UPDATE_SECONDS:
+                last_update = now
+                try:
+                    client.chat_update(channel=channel_id, ts=message_ts, text="".join(parts))
+                except SlackApiError as e:
+                    logger.warning(f"Failed to update streaming answer: {e}")
+        
+        answer_result = self.qa_system.answer_question(question, on_token=on_token)
+        
+        response = self._format_answer_response(answer_result)
+        try:
+            client.chat_update(channel=channel_id, ts=message_ts, text=response)
+        except SlackApiError as e:
+            # The placeholder may have been deleted; post the answer instead of losing it
+            logger.warning(f"Failed to update answer message, posting it instead: {e}")
+            client.chat_postMessage(channel=channel_id, text=response)
+        
+        # Only answers backed by sources are cached, so errors and empty results are retried
+        if answer_result.get('sources'):
+            with self._exact_cache_lock:
+                self._exact_cache[key] = answer_result
+                self._exact_cache.move_to_end(key)
+                while len(self._exact_cache) > EXACT_CACHE_SIZE:
+                    self._exact_cache.popitem(last=False)
+    
     def _handle_help_command(self, command, client):
         """Handle help command"""
         help_text = """
@@ -243,8 +331,13 @@ Need help? Contact your administrator.
                 )
                 return
             
-            # Get knowledge base statistics
-            stats = self.knowledge_base.get_collection_stats()
+            # Get knowledge base statistics, recounting at most every STATS_CACHE_SECONDS
+            now = time.monotonic()
+            computed_at, updated_text, stats = self._stats_cache
+            if stats is None or now - computed_at > STATS_CACHE_SECONDS:
+                stats = self.knowledge_base.get_collection_stats()
+                updated_text = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self._stats_cache = (now, updated_text, stats)
             
             stats_text = f"""
 📊 **Knowledge Base Statistics**
@@ -254,7 +347,7 @@ Need help? Contact your administrator.
 **Section Types:** {', '.join(f"{k}: {v}" for k, v in stats.get('section_types', {}).items())}
 
 **System Status:** ✅ Online and ready
-**Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Last Updated:** {updated_text}
 """
             
             client.chat_postMessage(
@@ -269,44 +362,43 @@ Need help? Contact your administrator.
                 text=f"😞 Sorry, I couldn't retrieve statistics: {str(e)}"
             )
     
+    def invalidate_stats_cache(self):
+        """Force the next /kb-stats to recount the collection"""
+        self._stats_cache = (0.0, "", None)
+    
     def _format_answer_response(self, answer_result: Dict[str, Any]) -> str:
         """Format the answer result for Slack"""
-        question = answer_result.get('question', '')
-        answer = answer_result.get('answer', '')
         sources = answer_result.get('sources', [])
         confidence = answer_result.get('confidence', 0.0)
         
-        # Format confidence indicator
-        if confidence > 0.8:
-            confidence_emoji = "🟢"
-        elif confidence > 0.6:
-            confidence_emoji = "🟡"
-        else:
-            confidence_emoji = "🔴"
-        
-        # Start building the response
-        response = f"**Question:** {question}\n\n"
-        response += f"**Answer:** {answer}\n\n"
-        response += f"**Confidence:** {confidence_emoji} {confidence:.2f}\n\n"
+        parts = [ANSWER_TEMPLATE.format(
+            question=answer_result.get('question', ''),
+            answer=answer_result.get('answer', ''),
+            emoji=CONFIDENCE_EMOJI[(confidence > 0.6) + (confidence > 0.8)],
+            confidence=confidence
+        )]
         
         # Add sources if available
         if sources:
-            response += "**Sources:**\n"
-            for i, source in enumerate(sources[:3], 1):  # Limit to 3 sources for readability
-                doc_type = source.get('document_type', 'Unknown')
-                doc_title = source.get('document_title', 'Untitled')
-                section_type = source.get('section_type', 'general')
-                
-                response += f"{i}. {doc_type.upper()}: {doc_title} ({section_type.replace('_', ' ').title()})\n"
+            parts.append("**Sources:**\n")
+            for i, source in enumerate(sources[:MAX_LISTED_SOURCES], 1):  # Limit sources for readability
+                get = source.get
+                parts.append(SOURCE_TEMPLATE.format(
+                    index=i,
+                    doc_type=get('document_type', 'Unknown').upper(),
+                    doc_title=get('document_title', 'Untitled'),
+                    section=section_label(get('section_type', 'general'))
+                ))
                 
                 # Add FAQ question if available
-                if source.get('faq_question'):
-                    response += f"   FAQ: {source['faq_question']}\n"
+                faq_question = get('faq_question')
+                if faq_question:
+                    parts.append(f"   FAQ: {faq_question}\n")
             
-            if len(sources) > 3:
-                response += f"   ... and {len(sources) - 3} more sources\n"
+            if len(sources) > MAX_LISTED_SOURCES:
+                parts.append(f"   ... and {len(sources) - MAX_LISTED_SOURCES} more sources\n")
         
-        return response
+        return "".join(parts)
     
     def load_documents(self):
         """Load documents from Google Docs"""
@@ -321,21 +413,43 @@ Need help? Contact your administrator.
                 logger.error("Failed to connect to Google Docs")
                 return False
             
-            # Fetch documents
-            documents = docs_client.fetch_all_documents()
-            
-            if not documents:
+            # Chunk documents as the concurrent fetches complete and write chunks in
+            # batches; the knowledge base is only cleared once a document has arrived
+            processor = DocumentProcessor()
+            document_count = 0
+            chunk_count = 0
+            batch = []
+            
+            def fetched_documents():
+                nonlocal document_count
+                for document in docs_client.iter_documents():
+                    if document_count == 0:
+                        self.knowledge_base.clear_knowledge_base()
+                    document_count += 1
+                    yield document
+            
+            for chunk in processor.iter_chunks(fetched_documents()):
+                batch.append(chunk)
+                if len(batch) >= LOAD_BATCH_SIZE:
+                    self.knowledge_base.add_documents(batch)
+                    chunk_count += len(batch)
+                    batch = []
+            
+            if batch:
+                self.knowledge_base.add_documents(batch)
+                chunk_count += len(batch)
+            
+            if not document_count:
                 logger.warning("No documents found")
                 return False
             
-            # Process documents
-            processor = DocumentProcessor()
-            processed_chunks = processor.process_all_documents(documents)
-            
-            # Update knowledge base
-            self.knowledge_base.update_documents(processed_chunks)
+            self.knowledge_base.persist()
+            self.qa_system.clear_caches()
+            with self._exact_cache_lock:
+                self._exact_cache.clear()
+            self.invalidate_stats_cache()
             
-            logger.info(f"Successfully loaded {len(documents)} documents ({len(processed_chunks)} chunks)")
+            logger.info(f"Successfully loaded {document_count} documents ({chunk_count} chunks)")
             return True
             
         except Exception as e:
@@ -362,6 +476,7 @@ Need help? Contact your administrator.
     def stop(self):
         """Stop the Slack bot"""
         logger.info("Stopping Slack bot...")
+        self._executor.shutdown(wait=False)
         # The handler will be stopped automatically when the process terminates
 
 def main():
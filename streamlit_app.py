@@ -1,7 +1,7 @@
 import streamlit as st
 import logging
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, List, Tuple
+import orjson
 from datetime import datetime
 import os
 import traceback
@@ -14,7 +14,7 @@ from config import config
 from google_docs_client import GoogleDocsClient
 from document_processor import DocumentProcessor
 from knowledge_base import KnowledgeBase
-from qa_system import QASystem
+from qa_system import QASystem, section_label
 
 # Page configuration
 st.set_page_config(
@@ -76,6 +76,96 @@ if 'qa_system' not in st.session_state:
 if 'initialized' not in st.session_state:
     st.session_state.initialized = False
 
+# Rendered conversation history entries, keyed by (question, timestamp)
+if 'rendered_history' not in st.session_state:
+    st.session_state.rendered_history = {}
+
+# Confidence CSS class indexed by how many of the 0.4/0.7 thresholds are exceeded
+CONFIDENCE_CLASSES = ("confidence-low", "confidence-medium", "confidence-high")
+
+# Most recent conversation entries shown in the history section
+HISTORY_DISPLAY_COUNT = 5
+
+# Seconds Streamlit reruns reuse an answer or search result for the same input
+RESULT_CACHE_TTL = 300
+
+# Shorter FAQ search terms match too broadly to be worth an embedding and search
+MIN_FAQ_SEARCH_LENGTH = 3
+
+@st.cache_resource
+def get_knowledge_base() -> KnowledgeBase:
+    """Knowledge base shared by all sessions, so the Chroma client and embedding caches exist once"""
+    return KnowledgeBase()
+
+@st.cache_resource
+def get_qa_system() -> QASystem:
+    """QA system shared by all sessions, so its semantic answer cache serves every user"""
+    return QASystem(get_knowledge_base())
+
+class UncachedAnswer(Exception):
+    """Raised from cached_answer so st.cache_data does not store an error or empty result"""
+    
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result['answer'])
+        self.result = result
+
+# The QA system argument is underscore-prefixed so Streamlit does not hash it
+@st.cache_data(ttl=RESULT_CACHE_TTL, show_spinner=False)
+def cached_answer(_qa_system: QASystem, question: str) -> Dict[str, Any]:
+    """Answer a question once per rerun-stable input"""
+    result = _qa_system.answer_question(question)
+    # Only answers backed by sources are cached, so errors and empty results are retried
+    if not result.get('sources'):
+        raise UncachedAnswer(result)
+    return result
+
+def get_answer(qa_system: QASystem, question: str) -> Dict[str, Any]:
+    """Answer a question, reusing a cached answer when one exists"""
+    try:
+        return cached_answer(qa_system, question)
+    except UncachedAnswer as e:
+        return e.result
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, show_spinner=False)
+def cached_faq_suggestions(_qa_system: QASystem, search_term: str, max_suggestions: int) -> List[Dict[str, Any]]:
+    """FAQ suggestions for a search term, reused across reruns"""
+    return _qa_system.get_faq_suggestions(search_term, max_suggestions)
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, show_spinner=False)
+def cached_meeting_topics(_qa_system: QASystem, topic: str, max_results: int) -> List[Dict[str, Any]]:
+    """Meeting topic search results, reused across reruns"""
+    return _qa_system.search_meeting_topics(topic, max_results)
+
+def render_history_entry(entry: Dict[str, Any]) -> Tuple[str, str]:
+    """Expander label and markdown body for a conversation entry, built once per entry"""
+    key = (entry['question'], entry['timestamp'])
+    rendered = st.session_state.rendered_history.get(key)
+    if rendered is None:
+        question = entry['question']
+        label = f"Q: {question[:50]}..." if len(question) > 50 else f"Q: {question}"
+        
+        lines = [
+            f"**Question:** {question}",
+            f"**Answer:** {entry['answer']}",
+            f"**Confidence:** {entry['confidence']:.2f}",
+            f"**Timestamp:** {entry['timestamp']}"
+        ]
+        if entry['sources']:
+            lines.append("**Sources:**\n" + "\n".join(
+                f"- {source['document_type'].upper()}: {source['document_title']}"
+                for source in entry['sources']
+            ))
+        
+        rendered = (label, "\n\n".join(lines))
+        st.session_state.rendered_history[key] = rendered
+    return rendered
+
+def clear_result_caches():
+    """Drop cached answers and search results, e.g. after the knowledge base changes"""
+    cached_answer.clear()
+    cached_faq_suggestions.clear()
+    cached_meeting_topics.clear()
+
 def initialize_system():
     """Initialize the knowledge base system"""
     try:
@@ -85,15 +175,9 @@ def initialize_system():
                 st.error("Configuration validation failed. Please check your environment variables.")
                 return False
             
-            # Initialize knowledge base
-            knowledge_base = KnowledgeBase()
-            
-            # Initialize QA system
-            qa_system = QASystem(knowledge_base)
-            
-            # Store in session state
-            st.session_state.knowledge_base = knowledge_base
-            st.session_state.qa_system = qa_system
+            # Knowledge base and QA system are created once per process
+            st.session_state.knowledge_base = get_knowledge_base()
+            st.session_state.qa_system = get_qa_system()
             st.session_state.initialized = True
             
             return True
@@ -128,6 +212,10 @@ def load_documents():
             
             # Update knowledge base
             st.session_state.knowledge_base.update_documents(processed_chunks)
+            st.session_state.knowledge_base.persist()
+            if st.session_state.qa_system:
+                st.session_state.qa_system.clear_caches()
+            clear_result_caches()
             
             st.success(f"Successfully loaded {len(documents)} documents ({len(processed_chunks)} chunks)")
             
@@ -149,31 +237,29 @@ def display_answer(answer_result: Dict[str, Any]):
     sources = answer_result.get('sources', [])
     confidence = answer_result.get('confidence', 0.0)
     
-    # Display question
-    st.markdown(f'<div class="question-box"><strong>Question:</strong> {question}</div>', unsafe_allow_html=True)
-    
-    # Display answer
-    st.markdown(f'<div class="answer-box"><strong>Answer:</strong><br>{answer}</div>', unsafe_allow_html=True)
+    # Question, answer, confidence and sources go out as one markdown element
+    confidence_color = CONFIDENCE_CLASSES[(confidence > 0.4) + (confidence > 0.7)]
+    parts = [
+        f'<div class="question-box"><strong>Question:</strong> {question}</div>\n\n',
+        f'<div class="answer-box"><strong>Answer:</strong><br>{answer}</div>\n\n',
+        f'<p class="{confidence_color}"><strong>Confidence:</strong> {confidence:.2f}</p>\n\n'
+    ]
     
-    # Display confidence
-    confidence_color = "confidence-high" if confidence > 0.7 else "confidence-medium" if confidence > 0.4 else "confidence-low"
-    st.markdown(f'<p class="{confidence_color}"><strong>Confidence:</strong> {confidence:.2f}</p>', unsafe_allow_html=True)
-    
-    # Display sources
     if sources:
-        st.markdown("**Sources:**")
+        parts.append("**Sources:**\n\n")
         for i, source in enumerate(sources, 1):
-            doc_type = source.get('document_type', 'Unknown')
-            doc_title = source.get('document_title', 'Untitled')
-            section_type = source.get('section_type', 'general')
-            relevance = source.get('relevance_score', 0.0)
-            
-            source_text = f"{i}. **{doc_type.upper()}**: {doc_title} ({section_type.replace('_', ' ').title()}) - Relevance: {relevance:.3f}"
-            
-            if source.get('faq_question'):
-                source_text += f"<br>FAQ: {source['faq_question']}"
-            
-            st.markdown(f'<div class="source-box">{source_text}</div>', unsafe_allow_html=True)
+            get = source.get
+            parts.append(
+                f'<div class="source-box">{i}. **{get("document_type", "Unknown").upper()}**: '
+                f'{get("document_title", "Untitled")} ({section_label(get("section_type", "general"))}) '
+                f'- Relevance: {get("relevance_score", 0.0):.3f}'
+            )
+            faq_question = get('faq_question')
+            if faq_question:
+                parts.append(f"<br>FAQ: {faq_question}")
+            parts.append('</div>\n\n')
+    
+    st.markdown("".join(parts), unsafe_allow_html=True)
 
 def main():
     """Main application function"""
@@ -214,6 +300,7 @@ def main():
         # Clear conversation
         if st.button("🧹 Clear Conversation"):
             st.session_state.conversation_history = []
+            st.session_state.rendered_history = {}
             st.rerun()
     
     # Main content area
@@ -235,11 +322,14 @@ def main():
         question = st.text_input("Enter your question:", placeholder="e.g., What is our remote work policy?")
         
     else:  # FAQ Suggestions
-        search_term = st.text_input("Search FAQs:", placeholder="e.g., remote work")
+        # A form only reruns on submit, not on every edit of the search box
+        with st.form("faq_search", clear_on_submit=False):
+            search_term = st.text_input("Search FAQs:", placeholder="e.g., remote work").strip()
+            st.form_submit_button("Search")
         question = None
         
-        if search_term:
-            suggestions = st.session_state.qa_system.get_faq_suggestions(search_term, 5)
+        if len(search_term) >= MIN_FAQ_SEARCH_LENGTH:
+            suggestions = cached_faq_suggestions(st.session_state.qa_system, search_term, 5)
             
             if suggestions:
                 st.write("**FAQ Suggestions:**")
@@ -252,7 +342,7 @@ def main():
     # Answer question
     if question:
         with st.spinner("Searching knowledge base..."):
-            answer_result = st.session_state.qa_system.answer_question(question)
+            answer_result = get_answer(st.session_state.qa_system, question)
             
             # Display answer
             display_answer(answer_result)
@@ -273,10 +363,12 @@ def main():
     
     with col1:
         st.subheader("📋 Meeting Topics Search")
-        meeting_topic = st.text_input("Search meeting topics:", placeholder="e.g., budget planning")
+        with st.form("meeting_topic_search", clear_on_submit=False):
+            meeting_topic = st.text_input("Search meeting topics:", placeholder="e.g., budget planning").strip()
+            st.form_submit_button("Search")
         
         if meeting_topic:
-            topics = st.session_state.qa_system.search_meeting_topics(meeting_topic, 5)
+            topics = cached_meeting_topics(st.session_state.qa_system, meeting_topic, 5)
             
             if topics:
                 for topic in topics:
@@ -305,17 +397,12 @@ def main():
     if st.session_state.conversation_history:
         st.header("💬 Conversation History")
         
-        for i, entry in enumerate(reversed(st.session_state.conversation_history[-5:])):
-            with st.expander(f"Q: {entry['question'][:50]}..." if len(entry['question']) > 50 else f"Q: {entry['question']}"):
-                st.write(f"**Question:** {entry['question']}")
-                st.write(f"**Answer:** {entry['answer']}")
-                st.write(f"**Confidence:** {entry['confidence']:.2f}")
-                st.write(f"**Timestamp:** {entry['timestamp']}")
-                
-                if entry['sources']:
-                    st.write("**Sources:**")
-                    for source in entry['sources']:
-                        st.write(f"- {source['document_type'].upper()}: {source['document_title']}")
+        # Newest first, indexing from the end instead of copying a slice
+        history = st.session_state.conversation_history
+        for i in range(len(history) - 1, max(-1, len(history) - 1 - HISTORY_DISPLAY_COUNT), -1):
+            label, body = render_history_entry(history[i])
+            with st.expander(label):
+                st.markdown(body)
     
     # Export conversation
     if st.session_state.conversation_history:
@@ -329,7 +416,7 @@ def main():
             
             st.download_button(
                 label="Download Conversation",
-                data=json.dumps(export_data, indent=2),
+                data=orjson.dumps(export_data, option=orjson.OPT_INDENT_2),
                 file_name=f"conversation_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
@@ -0,0 +1,89 @@
+"""Tests for request decoding and batching in the API service"""
+import asyncio
+
+import msgspec
+import pytest
+
+from api_service import EmbeddingBatcher, _validation_detail, document_sync_decoder, question_decoder
+
+def decode_error(decoder: msgspec.json.Decoder, body: bytes) -> Exception:
+    with pytest.raises(msgspec.DecodeError) as excinfo:
+        decoder.decode(body)
+    return excinfo.value
+
+def test_missing_field_detail():
+    error = decode_error(question_decoder, b'{}')
+    
+    assert _validation_detail(error) == [
+        {"type": "missing", "loc": ["body", "question"], "msg": "Field required"}
+    ]
+
+def test_wrong_type_detail():
+    error = decode_error(question_decoder, b'{"question": 5}')
+    
+    assert _validation_detail(error) == [
+        {"type": "value_error", "loc": ["body", "question"], "msg": "Expected `str`, got `int`"}
+    ]
+
+def test_constraint_detail():
+    error = decode_error(question_decoder, b'{"question": "What?", "max_context_items": 0}')
+    
+    assert _validation_detail(error) == [
+        {"type": "value_error", "loc": ["body", "max_context_items"], "msg": "Expected `int` >= 1"}
+    ]
+
+def test_nested_list_item_detail():
+    error = decode_error(document_sync_decoder, b'{"folder_ids": ["a", 1]}')
+    
+    assert _validation_detail(error)[0]["loc"] == ["body", "folder_ids", 1]
+
+def test_malformed_json_detail():
+    error = decode_error(question_decoder, b'{"question": ')
+    
+    detail = _validation_detail(error)
+    
+    assert len(detail) == 1
+    assert detail[0]["type"] == "json_invalid"
+    assert detail[0]["loc"] == ["body"]
+
+def test_concurrent_embeds_share_one_batch():
+    calls = []
+    
+    def embed_batch(texts):
+        calls.append(texts)
+        return [f"vector:{text}" for text in texts]
+    
+    async def run():
+        batcher = EmbeddingBatcher(embed_batch)
+        return await asyncio.gather(*(batcher.embed(text) for text in ["a", "b", "c"]))
+    
+    assert asyncio.run(run()) == ["vector:a", "vector:b", "vector:c"]
+    assert calls == [["a", "b", "c"]]
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    calls = []
+    
+    def embed_batch(texts):
+        calls.append(texts)
+        return texts
+    
+    async def run():
+        batcher = EmbeddingBatcher(embed_batch, window=60, max_batch=2)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.embed(text) for text in ["a", "b"])), timeout=5
+        )
+    
+    assert asyncio.run(run()) == ["a", "b"]
+    assert calls == [["a", "b"]]
+
+def test_embed_batch_error_reaches_every_caller():
+    error = RuntimeError("embeddings unavailable")
+    
+    def embed_batch(texts):
+        raise error
+    
+    async def run():
+        batcher = EmbeddingBatcher(embed_batch)
+        return await asyncio.gather(*(batcher.embed(text) for text in ["a", "b"]), return_exceptions=True)
+    
+    assert asyncio.run(run()) == [error, error]
@@ -0,0 +1,93 @@
+"""Tests for text cleaning and sentence-based chunk packing in DocumentProcessor"""
+import types
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+import document_processor
+from document_processor import CLEAN_RE, PUNCTUATION_TRANSLATION, DocumentProcessor, _clean_match, clean_text
+
+CHUNK_SIZE = 100
+CHUNK_OVERLAP = 40
+
+@pytest.fixture
+def processor(monkeypatch):
+    """Processor with a small chunk size; skips the tokenizer, which packing does not use"""
+    monkeypatch.setattr(
+        document_processor, 'config',
+        types.SimpleNamespace(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    )
+    processor = DocumentProcessor.__new__(DocumentProcessor)
+    processor.text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function=len
+    )
+    return processor
+
+def sentence(letter: str, length: int) -> str:
+    return letter * (length - 1) + "."
+
+def test_overlap_is_dropped_when_next_sentence_would_overflow(processor):
+    sentences = [sentence("a", 31), sentence("b", 31), sentence("c", 31), sentence("d", 91)]
+    
+    chunks = processor._pack_sentences(sentences)
+    
+    assert chunks == [" ".join(sentences[:3]), sentences[3]]
+    assert all(len(chunk) <= CHUNK_SIZE for chunk in chunks)
+
+def test_trailing_sentences_are_carried_as_overlap(processor):
+    sentences = [sentence(letter, 31) for letter in "abcdef"]
+    
+    chunks = processor._pack_sentences(sentences)
+    
+    assert chunks == [" ".join(sentences[0:3]), " ".join(sentences[2:5]), " ".join(sentences[4:6])]
+
+def test_oversized_sentence_falls_back_to_character_splitter(processor):
+    sentences = [sentence("a", 31), "word " * 50]
+    
+    chunks = processor._pack_sentences(sentences)
+    
+    assert chunks[0] == sentences[0]
+    assert len(chunks) > 2
+    assert all(len(chunk) <= CHUNK_SIZE for chunk in chunks)
+
+def test_split_section_packs_sentences_within_chunk_size(processor):
+    content = " ".join(f"Sentence number {i} talks about the quarterly plan." for i in range(20))
+    
+    chunks = processor.split_section(content, 'discussion')
+    
+    assert len(chunks) > 1
+    assert all(len(chunk) <= CHUNK_SIZE for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+def test_split_section_keeps_short_content_whole(processor):
+    assert processor.split_section("Short answer.", 'faq') == ["Short answer."]
+
+def regex_clean(text: str) -> str:
+    """clean_text's general path, which non-ASCII input takes"""
+    return CLEAN_RE.sub(_clean_match, text.translate(PUNCTUATION_TRANSLATION)).strip()
+
+@pytest.mark.parametrize('text', [
+    "",
+    "Plain sentence.",
+    "  leading and trailing  ",
+    "tabs\tand\nnewlines\r\nmixed \t\n runs",
+    "bell\x07 and null\x00 and escape\x1b[0m",
+    "a \x01 b",
+    "a\x01 \x01b",
+    "\x01 \x02",
+    "file\x1cgroup\x1drecord\x1eunit\x1fseparators\x0bvertical\x0cfeed",
+    "Q: What's the plan? A: Ship it -- by Friday (maybe); 100% sure & done!",
+    "emails a@b.com, #tags, $5 + 3 = 8, [x] {y} <z> | back\\slash `tick` ~tilde ^caret",
+    "".join(map(chr, range(128))),
+])
+def test_ascii_fast_path_matches_regex_path(text):
+    assert text.isascii()
+    assert clean_text(text) == regex_clean(text)
+
+def test_ascii_fast_path_matches_regex_path_for_each_character():
+    for code in range(128):
+        text = f"a {chr(code)}b{chr(code)} c"
+        assert clean_text(text) == regex_clean(text), repr(chr(code))
+
+def test_non_ascii_punctuation_is_normalized():
+    assert clean_text("\u201cQuoted\u201d \u2013 it\u2019s done\u2026") == '"Quoted" - it\'s done...'
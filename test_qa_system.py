@@ -0,0 +1,79 @@
+"""Tests for answering compound questions from the semantic answer cache"""
+import numpy as np
+import pytest
+
+from qa_system import QASystem
+from semantic_cache import SemanticCache
+
+DIMENSIONS = 8
+
+def unit(index: int) -> np.ndarray:
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    vector[index] = 1.0
+    return vector
+
+class StubKnowledgeBase:
+    """Embeds each known question part as a fixed vector"""
+    
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.calls = []
+    
+    def embed_queries(self, texts):
+        self.calls.append(texts)
+        return [self.embeddings[text] for text in texts]
+
+def cached_result(answer: str, source: str, confidence: float):
+    return {
+        'answer': answer,
+        'sources': [{'document_title': source}],
+        'context_used': [f"context for {answer}"],
+        'confidence': confidence,
+        'question': f"original {answer}",
+        'timestamp': '2024-01-01T00:00:00'
+    }
+
+@pytest.fixture
+def qa_system():
+    """QA system with a stub knowledge base; skips the LLM, which composing never calls"""
+    system = QASystem.__new__(QASystem)
+    system.answer_cache = SemanticCache(max_entries=8, ttl=300, threshold=0.95)
+    system.answer_cache.put(unit(0), cached_result('Remote work is allowed', 'Policy', 0.9))
+    system.answer_cache.put(unit(1), cached_result('PTO is 20 days', 'Handbook', 0.7))
+    system.knowledge_base = StubKnowledgeBase({
+        'What is the remote work policy': unit(0),
+        'how much PTO do we get': unit(1),
+        'who runs payroll': unit(2),
+    })
+    return system
+
+def test_compound_question_is_composed_from_cached_parts(qa_system):
+    question = "What is the remote work policy and how much PTO do we get?"
+    
+    result = qa_system.compose_cached_answer(question)
+    
+    assert qa_system.knowledge_base.calls == [['What is the remote work policy', 'how much PTO do we get']]
+    assert result['answer'] == "Remote work is allowed\n\nPTO is 20 days"
+    assert result['sources'] == [{'document_title': 'Policy'}, {'document_title': 'Handbook'}]
+    assert result['context_used'] == ["context for Remote work is allowed", "context for PTO is 20 days"]
+    assert result['confidence'] == 0.7
+    assert result['question'] == question
+    assert result['timestamp'] != '2024-01-01T00:00:00'
+
+def test_uncached_part_returns_none(qa_system):
+    assert qa_system.compose_cached_answer("What is the remote work policy and who runs payroll?") is None
+
+def test_single_part_question_is_not_composed(qa_system):
+    assert qa_system.compose_cached_answer("What is the remote work policy?") is None
+    assert qa_system.knowledge_base.calls == []
+
+def test_too_many_parts_are_not_composed(qa_system):
+    assert qa_system.compose_cached_answer("a and b and c and d") is None
+    assert qa_system.knowledge_base.calls == []
+
+def test_embedding_failure_returns_none(qa_system):
+    def fail(texts):
+        raise RuntimeError("embeddings unavailable")
+    qa_system.knowledge_base.embed_queries = fail
+    
+    assert qa_system.compose_cached_answer("What is the remote work policy and how much PTO do we get?") is None
@@ -0,0 +1,137 @@
+"""Tests for the int8 SemanticCache and its npz persistence"""
+import types
+
+import numpy as np
+import pytest
+
+import semantic_cache
+from semantic_cache import SemanticCache
+
+DIMENSIONS = 8
+
+def unit(index: int) -> np.ndarray:
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    vector[index] = 1.0
+    return vector
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic and wall clocks for the cache module"""
+    now = {'monotonic': 1000.0, 'time': 1_700_000_000.0}
+    
+    def advance(seconds: float):
+        now['monotonic'] += seconds
+        now['time'] += seconds
+    
+    monkeypatch.setattr(semantic_cache, 'time', types.SimpleNamespace(
+        monotonic=lambda: now['monotonic'],
+        time=lambda: now['time']
+    ))
+    return advance
+
+def test_similar_embedding_hits():
+    cache = SemanticCache(max_entries=4, ttl=300, threshold=0.95)
+    cache.put(unit(0), {'answer': 'zero'})
+    
+    assert cache.get(unit(0) + 0.1 * unit(1)) == {'answer': 'zero'}
+
+def test_dissimilar_embedding_misses():
+    cache = SemanticCache(max_entries=4, ttl=300, threshold=0.95)
+    cache.put(unit(0), {'answer': 'zero'})
+    
+    value, similarity = cache.lookup(unit(0) + unit(1))
+    
+    assert value is None
+    assert similarity == pytest.approx(0.707, abs=0.01)
+
+def test_lookup_threshold_overrides_default():
+    cache = SemanticCache(max_entries=4, ttl=300, threshold=0.95)
+    cache.put(unit(0), 'zero')
+    
+    assert cache.lookup(unit(0) + unit(1), threshold=0.7)[0] == 'zero'
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache(max_entries=4, ttl=60, threshold=0.95)
+    cache.put(unit(0), 'zero')
+    
+    clock(59)
+    assert cache.get(unit(0)) == 'zero'
+    clock(2)
+    assert cache.get(unit(0)) is None
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SemanticCache(max_entries=2, ttl=300, threshold=0.95)
+    cache.put(unit(0), 'zero')
+    clock(1)
+    cache.put(unit(1), 'one')
+    clock(1)
+    assert cache.get(unit(0)) == 'zero'
+    clock(1)
+    
+    cache.put(unit(2), 'two')
+    
+    assert len(cache) == 2
+    assert cache.get(unit(0)) == 'zero'
+    assert cache.get(unit(1)) is None
+    assert cache.get(unit(2)) == 'two'
+
+def test_embedding_dimension_change_resets_entries():
+    cache = SemanticCache(max_entries=4, ttl=300, threshold=0.95)
+    cache.put(unit(0), 'zero')
+    
+    cache.put(np.ones(DIMENSIONS * 2), 'wide')
+    
+    assert len(cache) == 1
+    assert cache.get(unit(0)) is None
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / 'answer_cache.npz')
+    cache = SemanticCache(max_entries=4, ttl=300, threshold=0.95)
+    cache.put(unit(0), {'answer': 'zero', 'confidence': 0.9})
+    cache.put(unit(1), {'answer': 'one', 'confidence': 0.5})
+    
+    cache.save(path)
+    restored = SemanticCache(max_entries=4, ttl=300, threshold=0.95)
+    restored.load(path)
+    
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['answer_cache.npz']
+    assert len(restored) == 2
+    assert restored.get(unit(0)) == {'answer': 'zero', 'confidence': 0.9}
+    assert restored.get(unit(1)) == {'answer': 'one', 'confidence': 0.5}
+
+def test_load_skips_expired_entries_and_applies_decode(tmp_path, clock):
+    path = str(tmp_path / 'answer_cache.npz')
+    cache = SemanticCache(max_entries=4, ttl=60, threshold=0.95)
+    cache.put(unit(0), 'old')
+    clock(30)
+    cache.put(unit(1), 'new')
+    cache.save(path)
+    
+    clock(40)
+    restored = SemanticCache(max_entries=4, ttl=60, threshold=0.95)
+    restored.load(path, decode=str.upper)
+    
+    assert len(restored) == 1
+    assert restored.get(unit(1)) == 'NEW'
+
+def test_load_keeps_most_recently_used_entries_that_fit(tmp_path, clock):
+    path = str(tmp_path / 'answer_cache.npz')
+    cache = SemanticCache(max_entries=3, ttl=300, threshold=0.95)
+    for index in range(3):
+        cache.put(unit(index), index)
+        clock(1)
+    cache.save(path)
+    
+    restored = SemanticCache(max_entries=2, ttl=300, threshold=0.95)
+    restored.load(path)
+    
+    assert restored.get(unit(0)) is None
+    assert restored.get(unit(1)) == 1
+    assert restored.get(unit(2)) == 2
+
+def test_save_of_empty_cache_writes_nothing(tmp_path):
+    path = tmp_path / 'answer_cache.npz'
+    
+    SemanticCache().save(str(path))
+    
+    assert not path.exists()